@@ -1,13 +1,22 @@
-from flask import Flask,request,render_template
+from flask import Flask,request,render_template,jsonify
 import numpy as np
-import pandas
-import sklearn
 import pickle
+import os
+from utils.crops import crop_dict
+from utils.drift import get_drift_monitor
 
 # importing model
-model = pickle.load(open('model.pkl','rb'))
-sc = pickle.load(open('standscaler.pkl','rb'))
-ms = pickle.load(open('minmaxscaler.pkl','rb'))
+# COMPACT_MODEL_PATH points at a model.crpf written by compact_model.py, which
+# has the scalers folded in and loads without scikit-learn (edge kiosks)
+COMPACT_MODEL_PATH = os.getenv('COMPACT_MODEL_PATH')
+if COMPACT_MODEL_PATH:
+    from utils.compact_forest import load_compact_forest
+    model = load_compact_forest(COMPACT_MODEL_PATH)
+    sc = ms = None
+else:
+    model = pickle.load(open('model.pkl','rb'))
+    sc = pickle.load(open('standscaler.pkl','rb'))
+    ms = pickle.load(open('minmaxscaler.pkl','rb'))
 
 # creating flask app
 app = Flask(__name__)
@@ -27,16 +36,16 @@ def predict():
     rainfall = request.form['Rainfall']
 
     feature_list = [N, P, K, temp, humidity, ph, rainfall]
-    single_pred = np.array(feature_list).reshape(1, -1)
+    single_pred = np.array(feature_list, dtype=float).reshape(1, -1)
 
-    scaled_features = ms.transform(single_pred)
-    final_features = sc.transform(scaled_features)
+    if ms is not None:
+        scaled_features = ms.transform(single_pred)
+        final_features = sc.transform(scaled_features)
+    else:
+        final_features = single_pred
     prediction = model.predict(final_features)
-
-    crop_dict = {1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 6: "Papaya", 7: "Orange",
-                 8: "Apple", 9: "Muskmelon", 10: "Watermelon", 11: "Mango", 12: "Banana",
-                 13: "Pomegranate", 14: "Lentil", 15: "Blackgram", 16: "Mungbean", 17: "Mothbeans",
-                 18: "Pigeonpeas", 19: "Kidneybeans", 20: "Chickpea", 21: "Coffee"}
+    if ms is not None:
+        get_drift_monitor(sc, ms, model).record(single_pred, prediction)
 
     if prediction[0] in crop_dict:
         crop = crop_dict[prediction[0]]
@@ -45,6 +54,13 @@ def predict():
         result = "Sorry, we could not determine the best crop to be cultivated with the provided data."
     return render_template('index.html',result = result)
 
+# input drift scores and alerts (not available for the compact model, which has no scalers)
+@app.route("/drift")
+def drift():
+    if ms is None:
+        return jsonify({"error": "drift monitoring needs the fitted scalers"}), 404
+    return jsonify(get_drift_monitor(sc, ms, model).report())
+
 
 
 
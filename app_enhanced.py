@@ -3,9 +3,16 @@ import numpy as np
 import pickle
 import os
 from utils.translations import get_text
-from utils.firebase_auth import init_session_state, login_user, signup_user, logout_user, is_logged_in
+from utils.firebase_auth import init_session_state, login_user, signup_user, logout_user, is_logged_in, is_admin
 from utils.weather import get_weather_forecast, get_forecast_5day
 from utils.forum import add_forum_post, get_forum_posts, add_reply, search_forum_posts
+from utils.crops import crop_dict, FEATURE_NAMES
+from utils.explain import explain_predictions, supports_attribution
+from utils.insights import get_crop_insight, get_bucket
+from utils.rate_limit import admission, cache_response, get_cached_response
+from utils.prefetch import InsightPrefetcher, PREFETCH_TOP_K, prefetch_stats
+from utils.session_store import get_session_store
+from utils.drift import get_drift_monitor
 import requests
 
 st.set_page_config(
@@ -66,12 +73,10 @@ custom_css = """
 """
 st.markdown(custom_css, unsafe_allow_html=True)
 
-crop_dict = {
-    1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 6: "Papaya", 7: "Orange",
-    8: "Apple", 9: "Muskmelon", 10: "Watermelon", 11: "Grapes", 12: "Mango", 13: "Banana",
-    14: "Pomegranate", 15: "Lentil", 16: "Blackgram", 17: "Mungbean", 18: "Mothbeans",
-    19: "Pigeonpeas", 20: "Kidneybeans", 21: "Chickpea", 22: "Coffee"
-}
+HUGGINGFACE_API_URL = os.getenv(
+    "HUGGINGFACE_API_URL",
+    "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+)
 
 @st.cache_resource
 def load_models():
@@ -84,26 +89,107 @@ def load_models():
         st.error(f"Error loading model files: {str(e)}")
         return None, None, None
 
-def predict_crop(features, model, sc, ms):
+def session_get(key, default=None):
+    """Read bulky per-session data from the server-side session store."""
+    return get_session_store().get(st.session_state.session_id, key, default)
+
+def session_set(key, value):
+    get_session_store().set(st.session_state.session_id, key, value)
+
+def current_recommendation():
+    """The session's latest recommendation (crop, features, ranking), or None.
+
+    It lives in the session store with the chat history, so idle eviction or
+    logout removes both together.
+    """
+    recommendation = session_get('recommendation')
+    if not recommendation or not recommendation.get('features'):
+        return None
+    return recommendation
+
+def predict_crop(features, model, sc, ms, explain=False, monitor=True):
+    """Predicted crop name, or (crop, attribution) when ``explain`` is set.
+
+    The crop always comes from model.predict. The attribution maps each
+    feature name to its contribution to that crop's probability and carries
+    the full class probabilities (``proba``) for rank_crops. It is None for
+    models that aren't tree based. With ``monitor`` set the inputs and
+    prediction are recorded for drift monitoring.
+    """
     try:
         single_pred = np.array(features).reshape(1, -1)
         scaled_features = ms.transform(single_pred)
         final_features = sc.transform(scaled_features)
         prediction = model.predict(final_features)
         
-        if prediction[0] in crop_dict:
-            return crop_dict[prediction[0]]
-        return None
+        attribution = None
+        if explain and supports_attribution(model):
+            proba, contributions, bias = explain_predictions(model, final_features)
+            best = int(np.flatnonzero(model.classes_ == prediction[0])[0])
+            attribution = {
+                "base": float(bias[best]),
+                "probability": float(proba[0, best]),
+                "contributions": dict(zip(FEATURE_NAMES, contributions[0, :, best].tolist())),
+                "proba": proba[0],
+            }
+        
+        if monitor:
+            get_drift_monitor(sc, ms, model).record(single_pred, prediction)
+        crop = crop_dict.get(prediction[0])
+        return (crop, attribution) if explain else crop
     except Exception as e:
         st.error(f"Error making prediction: {str(e)}")
-        return None
+        return (None, None) if explain else None
+
+def rank_crops(features, model, sc, ms, k=PREFETCH_TOP_K, proba=None):
+    """Top-k crops by predicted probability, most likely first.
+
+    Pass ``proba`` when the class probabilities are already known (from
+    predict_crop's attribution) to skip another pass over the model.
+    """
+    if proba is None and not hasattr(model, "predict_proba"):
+        crop = predict_crop(features, model, sc, ms, monitor=False)
+        return [crop] if crop else []
+    try:
+        if proba is None:
+            final_features = sc.transform(ms.transform(np.array(features).reshape(1, -1)))
+            proba = model.predict_proba(final_features)[0]
+        top = np.argsort(proba)[::-1][:k]
+        return [crop_dict[model.classes_[i]] for i in top if model.classes_[i] in crop_dict and proba[i] > 0]
+    except Exception as e:
+        st.error(f"Error ranking crops: {str(e)}")
+        return []
+
+def insight_generator(features, lang):
+    """Speculative insight generation for a crop, safe to run on a prefetch worker thread.
+
+    Only spare upstream capacity is used and no user is charged. Returns None
+    when the insight isn't available, so the prefetcher fetches it on demand.
+    """
+    def generate(crop):
+        text, _ = fetch_ai_response(crop, features, lang=lang, speculative=True)
+        return text
+    return generate
+
+def ai_recommendations(crop, features, chat_input=None, chat_history=None, lang="en", user=None):
+    """Insight or chat answer for display; failures come back as a message."""
+    text, error = fetch_ai_response(crop, features, chat_input, chat_history, lang, user)
+    return text or error
+
+def fetch_ai_response(crop, features, chat_input=None, chat_history=None, lang="en", user=None,
+                      speculative=False):
+    """Returns (text, None), or (None, error message) when nothing could be generated."""
+    # Generic crop guidance is served from the prebuilt knowledge base
+    # (see build_insights.py); the live LLM only answers free-form questions.
+    if not chat_input:
+        insight = get_crop_insight(crop, features, lang)
+        if insight:
+            return insight, None
 
-def ai_recommendations(crop, features, chat_input=None, chat_history=None, lang="en"):
-    api_url = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
     api_token = st.secrets["HUGGINGFACE_API_TOKEN"] or os.getenv("HUGGINGFACE_API_TOKEN")
     
     if not api_token:
-        return "AI chatbot not configured. Please add HUGGINGFACE_API_TOKEN."
+        return None, "AI chatbot not configured. Please add HUGGINGFACE_API_TOKEN."
     
     language_instruction = ""
     if lang == "te":
@@ -136,18 +222,27 @@ def ai_recommendations(crop, features, chat_input=None, chat_history=None, lang=
         detailed_prompt += f"\n\nLatest User Query: {chat_input}"
 
     headers = {"Authorization": f"Bearer {api_token}"}
+    cache_key = f"{crop}|{get_bucket(features)}|{lang}|{(chat_input or '').strip().lower()}"
     
-    try:
-        response = requests.post(api_url, headers=headers, json={"inputs": detailed_prompt}, timeout=30)
-        if response.status_code == 200:
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                return result[0].get("generated_text", "Unable to fetch agricultural insights.")
-            return "Unable to fetch agricultural insights."
-        else:
-            return f"Unable to fetch agricultural insights. Status: {response.status_code}"
-    except Exception as e:
-        return f"Error fetching insights: {str(e)}"
+    # Per-user token bucket plus a global cap on in-flight calls; shed load
+    # to the last answer for the same question, or a fast "try later"
+    with admission("huggingface", user, speculative=speculative) as rejected:
+        if rejected:
+            cached = get_cached_response("huggingface", cache_key)
+            return (cached, None) if cached else (None, get_text(lang, 'try_later'))
+        
+        try:
+            response = requests.post(HUGGINGFACE_API_URL, headers=headers, json={"inputs": detailed_prompt}, timeout=30)
+            if response.status_code == 200:
+                result = response.json()
+                if isinstance(result, list) and len(result) > 0 and result[0].get("generated_text"):
+                    cache_response("huggingface", cache_key, result[0]["generated_text"])
+                    return result[0]["generated_text"], None
+                return None, "Unable to fetch agricultural insights."
+            else:
+                return None, f"Unable to fetch agricultural insights. Status: {response.status_code}"
+        except Exception as e:
+            return None, f"Error fetching insights: {str(e)}"
 
 def show_login_page(lang):
     st.markdown(f"<h1 class='main-header'>{get_text(lang, 'app_title')}</h1>", unsafe_allow_html=True)
@@ -187,6 +282,96 @@ def show_login_page(lang):
             else:
                 st.warning("Please enter both email and password")
 
+def show_attribution(lang, crop, attribution):
+    feature_keys = ['nitrogen', 'phosphorus', 'potassium', 'temperature', 'humidity', 'ph', 'rainfall']
+    contributions = {
+        get_text(lang, key): value * 100
+        for key, value in zip(feature_keys, attribution["contributions"].values())
+    }
+    with st.expander(f"🔍 {get_text(lang, 'why_this_crop')} - {crop}"):
+        st.caption(get_text(lang, 'attribution_caption').format(
+            base=attribution['base'], probability=attribution['probability']
+        ))
+        st.bar_chart({"contribution": contributions})
+
+def show_drift_monitor(lang, model, sc, ms):
+    report = get_drift_monitor(sc, ms, model).report()
+    if not report["records"]:
+        return
+    with st.expander(f"📈 {get_text(lang, 'input_monitoring')}"):
+        for alert in report["alerts"]:
+            st.warning(alert)
+        st.caption(get_text(lang, 'drift_caption').format(
+            records=report['records'], class_drift=report['class_drift']
+        ))
+        st.table([
+            {
+                get_text(lang, 'drift_feature'): name,
+                get_text(lang, 'drift_score'): round(f["score"], 2),
+                get_text(lang, 'drift_out_of_range'): f"{f['out_of_range']:.0%}",
+                get_text(lang, 'drift_mean_shift'): round(f["mean_shift"], 2),
+                get_text(lang, 'drift_percentiles'): f"{f['p05']:.1f} / {f['p50']:.1f} / {f['p95']:.1f}",
+                get_text(lang, 'drift_training_range'): f"{f['train_min']:g} - {f['train_max']:g}",
+            }
+            for name, f in report["features"].items()
+        ])
+
+def prefetch_alternatives(lang, recommendation):
+    """Start insight generation for the runner-ups in the background. Returns the prefetch key.
+
+    New inputs or a language change cancel the old batch and start a new one.
+    """
+    features = recommendation['features']
+    prefetch_key = (tuple(features), lang)
+    st.session_state.insight_prefetcher.start(
+        prefetch_key, recommendation['ranking'][1:], insight_generator(features, lang)
+    )
+    return prefetch_key
+
+def show_recommendation_followups(lang, recommendation):
+    current_crop = recommendation['crop']
+    features = recommendation['features']
+    
+    alternatives = recommendation['ranking'][1:]
+    if alternatives:
+        prefetch_key = prefetch_alternatives(lang, recommendation)
+        
+        other_crop = st.selectbox(get_text(lang, 'other_crops'), alternatives, index=None, key="other_crop")
+        if other_crop:
+            def generate(crop):
+                return ai_recommendations(crop, features, lang=lang, user=st.session_state.user_email)
+            with st.spinner("Generating Agricultural insights..."):
+                description = st.session_state.insight_prefetcher.get(prefetch_key, other_crop, generate)
+            with st.expander(f"📚 {get_text(lang, 'crop_insights')} - {other_crop}", expanded=True):
+                st.write(description)
+        st.caption(f"⚡ Insight prefetch hit rate: {st.session_state.insight_prefetcher.hit_rate:.0%}")
+    
+    st.divider()
+    st.subheader(f"🤖 {get_text(lang, 'ai_chat')} - {current_crop}")
+    
+    store = get_session_store()
+    session_id = st.session_state.session_id
+    
+    for msg in session_get('chat_history', []):
+        st.chat_message(msg['role']).write(msg['content'])
+    
+    chat_input = st.chat_input(get_text(lang, 'ask_question'))
+    if chat_input:
+        store.append_chat(session_id, 'user', chat_input)
+        st.chat_message('user').write(chat_input)
+        
+        with st.spinner("Generating response..."):
+            chat_response = ai_recommendations(
+                current_crop, 
+                features, 
+                chat_input, 
+                session_get('chat_history', []),
+                lang=lang,
+                user=st.session_state.user_email
+            )
+            store.append_chat(session_id, 'assistant', chat_response)
+            st.chat_message('assistant').write(chat_response)
+
 def show_home_page(lang, model, sc, ms):
     st.markdown(f"<h2>🌾 {get_text(lang, 'recommended_crop')}</h2>", unsafe_allow_html=True)
     
@@ -205,49 +390,39 @@ def show_home_page(lang, model, sc, ms):
 
     if st.button(get_text(lang, 'get_recommendation'), type="primary"):
         feature_list = [nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall]
-        result = predict_crop(feature_list, model, sc, ms)
+        result, attribution = predict_crop(feature_list, model, sc, ms, explain=True)
         if result:
-            st.session_state.chat_history = []
-            st.session_state.current_crop = result
-            st.session_state.current_features = feature_list
+            ranking = rank_crops(feature_list, model, sc, ms,
+                                 proba=attribution["proba"] if attribution else None)
+            recommendation = {
+                "crop": result,
+                "features": feature_list,
+                "ranking": [result] + [c for c in ranking if c != result],
+            }
+            session_set('chat_history', [])
+            session_set('recommendation', recommendation)
+            # Runner-ups are generated while the recommended crop's insight is fetched
+            prefetch_alternatives(lang, recommendation)
             
             st.markdown(f"""<div class='crop-result'>
                 🌱 {result}
             </div>""", unsafe_allow_html=True)
             
             with st.spinner("Generating Agricultural insights..."):
-                description = ai_recommendations(result, feature_list, lang=lang)
+                description = ai_recommendations(result, feature_list, lang=lang, user=st.session_state.user_email)
             with st.expander(f"📚 {get_text(lang, 'crop_insights')} - {result}", expanded=True):
                 st.write(description)
-    
-    if st.session_state.get('current_crop'):
-        st.divider()
-        st.subheader(f"🤖 {get_text(lang, 'ai_chat')} - {st.session_state.current_crop}")
-        
-        for msg in st.session_state.get('chat_history', []):
-            st.chat_message(msg['role']).write(msg['content'])
-        
-        chat_input = st.chat_input(get_text(lang, 'ask_question'))
-        if chat_input:
-            st.session_state.chat_history.append({
-                'role': 'user',
-                'content': chat_input
-            })
-            st.chat_message('user').write(chat_input)
             
-            with st.spinner("Generating response..."):
-                chat_response = ai_recommendations(
-                    st.session_state.current_crop, 
-                    st.session_state.current_features, 
-                    chat_input, 
-                    st.session_state.chat_history,
-                    lang=lang
-                )
-                st.session_state.chat_history.append({
-                    'role': 'assistant',
-                    'content': chat_response
-                })
-                st.chat_message('assistant').write(chat_response)
+            if attribution:
+                show_attribution(lang, result, attribution)
+    
+    recommendation = current_recommendation()
+    if recommendation:
+        show_recommendation_followups(lang, recommendation)
+    
+    # Process-wide telemetry covering every user's inputs, so admins only
+    if is_admin():
+        show_drift_monitor(lang, model, sc, ms)
 
 def show_weather_page(lang):
     st.markdown(f"<h2>🌤️ {get_text(lang, 'weather')}</h2>", unsafe_allow_html=True)
@@ -255,7 +430,7 @@ def show_weather_page(lang):
     city = st.text_input(get_text(lang, 'weather_location'), value="Hyderabad")
     
     if st.button(get_text(lang, 'get_weather'), type="primary"):
-        weather_info, error = get_weather_forecast(city)
+        weather_info, error = get_weather_forecast(city, user=st.session_state.user_email, lang=lang)
         
         if weather_info:
             st.markdown(f"""
@@ -270,7 +445,7 @@ def show_weather_page(lang):
             </div>
             """, unsafe_allow_html=True)
             
-            forecast, error = get_forecast_5day(city)
+            forecast, error = get_forecast_5day(city, user=st.session_state.user_email, lang=lang)
             if forecast:
                 st.subheader("📅 24-Hour Forecast")
                 cols = st.columns(4)
@@ -285,6 +460,28 @@ def show_weather_page(lang):
         else:
             st.error(error)
 
+def submit_reply(post_id):
+    # Runs as a button callback, before the page is drawn, so the reply is
+    # already in the feed on this run instead of needing another rerun
+    reply_name = st.session_state.get(f"reply_name_{post_id}", "")
+    reply_message = st.session_state.get(f"reply_message_{post_id}", "")
+    if not (reply_name and reply_message):
+        notice = ("warning", "Please fill in both fields")
+    elif len(reply_name) < 2:
+        notice = ("warning", "Name must be at least 2 characters")
+    elif len(reply_message) < 5:
+        notice = ("warning", "Reply must be at least 5 characters")
+    else:
+        success, error = add_reply(post_id, reply_name, reply_message)
+        if success:
+            notice = ("success", "✅ Reply added!")
+            # Don't keep the submitted draft around in session state
+            st.session_state.pop(f"reply_name_{post_id}", None)
+            st.session_state.pop(f"reply_message_{post_id}", None)
+        else:
+            notice = ("error", f"Failed to add reply. Please try again. ({error})")
+    st.session_state.reply_notice = (post_id, *notice)
+
 def show_forum_page(lang):
     st.markdown(f"<h2>💬 {get_text(lang, 'forum_title')}</h2>", unsafe_allow_html=True)
     st.write(get_text(lang, 'forum_desc'))
@@ -303,12 +500,13 @@ def show_forum_page(lang):
                 elif len(message) < 10:
                     st.warning("Message must be at least 10 characters")
                 else:
-                    success = add_forum_post(name, topic, message)
+                    # The feed below is drawn after this and shows the new post
+                    # straight away, so no rerun is needed
+                    success, error = add_forum_post(name, topic, message)
                     if success:
                         st.success("✅ Your post has been added!")
-                        st.rerun()
                     else:
-                        st.error("Failed to add post. Please try again.")
+                        st.error(f"Failed to add post. Please try again. ({error})")
             else:
                 st.warning("Please fill in all fields")
     
@@ -332,7 +530,7 @@ def show_forum_page(lang):
             st.markdown(f"""
             <div class='forum-post'>
                 <h4>📌 {post['topic']}</h4>
-                <p><strong>👤 {post['name']}</strong> • <em>{post['timestamp']}</em></p>
+                <p><strong>👤 {post['name']}</strong> • <em>{post['timestamp']}</em>{" • ⏳ sending..." if post.get('pending') else ""}{" • ⚠️ not delivered" if post.get('failed') else ""}</p>
                 <p>{post['message']}</p>
             </div>
             """, unsafe_allow_html=True)
@@ -343,30 +541,21 @@ def show_forum_page(lang):
                 for reply_idx, reply in enumerate(replies):
                     st.markdown(f"""
                     <div style='margin-left: 2rem; padding: 0.8rem; background-color: #e8f5e9; border-radius: 6px; margin-bottom: 0.5rem; border-left: 3px solid #4CAF50;'>
-                        <p style='margin: 0; color: black;'><strong>👤 {reply['name']}</strong> • <em>{reply['timestamp']}</em></p>
+                        <p style='margin: 0; color: black;'><strong>👤 {reply['name']}</strong> • <em>{reply['timestamp']}</em>{" • ⏳ sending..." if reply.get('pending') else ""}{" • ⚠️ not delivered" if reply.get('failed') else ""}</p>
                         <p style='margin: 0.3rem 0 0 0; color: black;'>{reply['message']}</p>
                     </div>
                     """, unsafe_allow_html=True)
             
             with st.expander(f"💬 Reply to this post"):
-                reply_name = st.text_input("Your name", max_chars=100, key=f"reply_name_{post_id}")
-                reply_message = st.text_area("Your reply", max_chars=1000, key=f"reply_message_{post_id}")
+                st.text_input("Your name", max_chars=100, key=f"reply_name_{post_id}")
+                st.text_area("Your reply", max_chars=1000, key=f"reply_message_{post_id}")
                 
-                if st.button("Post Reply", type="secondary", key=f"submit_reply_{post_id}"):
-                    if reply_name and reply_message:
-                        if len(reply_name) < 2:
-                            st.warning("Name must be at least 2 characters")
-                        elif len(reply_message) < 5:
-                            st.warning("Reply must be at least 5 characters")
-                        else:
-                            success = add_reply(post_id, reply_name, reply_message)
-                            if success:
-                                st.success("✅ Reply added!")
-                                st.rerun()
-                            else:
-                                st.error("Failed to add reply. Please try again.")
-                    else:
-                        st.warning("Please fill in both fields")
+                st.button("Post Reply", type="secondary", key=f"submit_reply_{post_id}",
+                          on_click=submit_reply, args=(post_id,))
+                notice = st.session_state.get('reply_notice')
+                if notice and notice[0] == post_id:
+                    getattr(st, notice[1])(notice[2])
+                    del st.session_state['reply_notice']
             
             st.markdown("---")
     else:
@@ -375,12 +564,8 @@ def show_forum_page(lang):
 def main():
     init_session_state()
     
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'current_crop' not in st.session_state:
-        st.session_state.current_crop = None
-    if 'current_features' not in st.session_state:
-        st.session_state.current_features = None
+    if 'insight_prefetcher' not in st.session_state:
+        st.session_state.insight_prefetcher = InsightPrefetcher()
     if 'language' not in st.session_state:
         st.session_state.language = 'en'
     
@@ -406,6 +591,10 @@ def main():
                 label_visibility="collapsed"
             )
             
+            if is_admin():
+                with st.expander(f"🛠️ {get_text(lang, 'diagnostics')}"):
+                    st.caption(get_text(lang, 'prefetch_stats').format(**prefetch_stats()))
+            
             if st.button(get_text(lang, 'logout')):
                 logout_user()
                 st.rerun()
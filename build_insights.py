@@ -0,0 +1,72 @@
+"""Offline build step for the crop insight knowledge base.
+
+Generates one insight document per crop, language and soil/climate bucket
+with the Hugging Face Mistral model and stores them in crop_insights.json,
+which the app then serves locally instead of calling the LLM per request.
+
+Usage:
+    HUGGINGFACE_API_TOKEN=... python build_insights.py [--crops Rice Maize] [--rebuild]
+"""
+import argparse
+import os
+import time
+
+import requests
+
+from utils.crops import crop_dict
+from utils.insights import INSIGHTS_PATH, build_knowledge_base
+
+API_URL = os.getenv(
+    "HUGGINGFACE_API_URL",
+    "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.2"
+)
+
+def make_mistral_generator(api_token, retries=3, timeout=60):
+    headers = {"Authorization": f"Bearer {api_token}"}
+
+    def generate(prompt):
+        payload = {
+            "inputs": prompt,
+            "parameters": {"max_new_tokens": 800, "return_full_text": False},
+        }
+        for attempt in range(retries):
+            try:
+                response = requests.post(API_URL, headers=headers, json=payload, timeout=timeout)
+                if response.status_code == 200:
+                    result = response.json()
+                    if isinstance(result, list) and len(result) > 0:
+                        return result[0].get("generated_text")
+                    return None
+                print(f"  Hugging Face returned status {response.status_code}")
+            except Exception as e:
+                print(f"  Error calling Hugging Face: {e}")
+            # Model cold starts and rate limits are transient, back off and retry
+            time.sleep(2 ** attempt)
+        return None
+
+    return generate
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local crop insight knowledge base")
+    parser.add_argument("--output", default=INSIGHTS_PATH, help="knowledge base file to write")
+    parser.add_argument("--crops", nargs="*", help="only build these crops (default: all)")
+    parser.add_argument("--langs", nargs="*", default=["en", "te"], help="languages to build")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate existing documents")
+    args = parser.parse_args()
+
+    api_token = os.getenv("HUGGINGFACE_API_TOKEN")
+    if not api_token:
+        parser.error("HUGGINGFACE_API_TOKEN is not set")
+
+    crops = args.crops or list(crop_dict.values())
+    generated, skipped, failed = build_knowledge_base(
+        make_mistral_generator(api_token),
+        crops,
+        langs=args.langs,
+        path=args.output,
+        rebuild=args.rebuild,
+    )
+    print(f"Generated {generated}, kept {skipped}, failed {failed} insight documents in {args.output}")
+
+if __name__ == "__main__":
+    main()
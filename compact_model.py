@@ -0,0 +1,289 @@
+"""Compact the random forest in model.pkl for low-memory edge deployment.
+
+Folds the MinMax and Standard scalers into the split thresholds, merges
+identical leaves (and splits whose two branches are identical), prunes
+trees that don't change the forest's predictions, and writes the compact
+binary format read by utils/compact_forest.py, which only needs NumPy.
+
+A fidelity report compares the compact forest with the original one on
+the training distribution (the dataset CSV, or uniform samples within the
+scaler's fitted ranges when it isn't available), along with artifact size,
+startup time, peak memory and single-row latency for both.
+
+Usage:
+    python compact_model.py --data Crop_recommendation.csv --output model.crpf
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from utils.compact_forest import MAX_TREE_NODES, CompactForest, load_compact_forest, save_compact_forest
+from utils.crops import FEATURE_NAMES, crop_dict, label_map
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# ru_maxrss is inherited across fork/exec, so a child started by a large
+# parent would report the parent's peak. VmHWM is the child's own.
+_PEAK_RSS = """
+def peak_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+_ORIGINAL_STARTUP = _PEAK_RSS + """
+import json, pickle, sys
+import numpy as np
+model = pickle.load(open(sys.argv[1], "rb"))
+sc = pickle.load(open(sys.argv[2], "rb"))
+ms = pickle.load(open(sys.argv[3], "rb"))
+model.predict(sc.transform(ms.transform(np.array([[90, 42, 43, 20.8, 82, 6.5, 202.9]]))))
+print(json.dumps({"max_rss_kb": peak_rss_kb()}))
+"""
+
+_COMPACT_STARTUP = _PEAK_RSS + """
+import json, sys
+sys.path.insert(0, sys.argv[2])
+from utils.compact_forest import load_compact_forest
+model = load_compact_forest(sys.argv[1])
+model.predict([[90, 42, 43, 20.8, 82, 6.5, 202.9]])
+print(json.dumps({"max_rss_kb": peak_rss_kb()}))
+"""
+
+def scaler_affine(ms, sc):
+    """Per-feature (a, b) such that sc.transform(ms.transform(x)) == a * x + b."""
+    a = np.asarray(ms.scale_, dtype=float)
+    b = np.asarray(ms.min_, dtype=float)
+    if sc is not None:
+        mean = sc.mean_ if sc.mean_ is not None else 0.0
+        scale = sc.scale_ if sc.scale_ is not None else 1.0
+        a, b = a / scale, (b - mean) / scale
+    if np.any(a <= 0):
+        raise ValueError("Scalers with non-positive scale cannot be folded into thresholds")
+    return a, b
+
+def compact_tree(tree, a, b):
+    """Nested (feature, threshold, left, right) tuples with leaves as class indices.
+
+    Thresholds are mapped back to raw feature units. A split whose branches
+    end up identical (e.g. two leaves voting for the same class) is replaced
+    by that branch.
+    """
+    children_left = tree.children_left
+    children_right = tree.children_right
+    values = tree.value[:, 0, :]
+
+    def build(node):
+        if children_left[node] == -1:
+            return int(np.argmax(values[node]))
+        left = build(children_left[node])
+        right = build(children_right[node])
+        if left == right:
+            return left
+        f = int(tree.feature[node])
+        threshold = np.float32((tree.threshold[node] - b[f]) / a[f])
+        return (f, threshold, left, right)
+
+    return build(0)
+
+def flatten_tree(root):
+    """Preorder arrays (feature, threshold, right) for one compacted tree."""
+    feature, threshold, right = [], [], []
+
+    def visit(node):
+        i = len(feature)
+        if isinstance(node, tuple):
+            f, t, left_node, right_node = node
+            feature.append(f)
+            threshold.append(t)
+            right.append(0)
+            visit(left_node)
+            right[i] = len(feature)
+            visit(right_node)
+        else:
+            feature.append(-1)
+            threshold.append(0.0)
+            right.append(node)
+
+    visit(root)
+    if len(feature) > MAX_TREE_NODES:
+        raise ValueError(f"Tree has {len(feature)} nodes, more than the format's {MAX_TREE_NODES}")
+    return feature, threshold, right
+
+def compact_forest(model, ms, sc):
+    a, b = scaler_affine(ms, sc)
+    trees = [flatten_tree(compact_tree(est.tree_, a, b)) for est in model.estimators_]
+    return CompactForest(
+        model.classes_,
+        [len(feature) for feature, _, _ in trees],
+        np.concatenate([feature for feature, _, _ in trees]).astype(np.int8),
+        np.concatenate([threshold for _, threshold, _ in trees]).astype(np.float32),
+        np.concatenate([right for _, _, right in trees]).astype(np.uint16),
+        model.n_features_in_,
+    )
+
+def prune_trees(forest, X, reference, min_fidelity):
+    """Greedily drop trees while agreement with ``reference`` stays above ``min_fidelity``.
+
+    Exact duplicates of an earlier tree are tried first, then the trees that
+    agree least with the reference predictions.
+    """
+    votes = forest.tree_votes(X)
+    n_rows, n_trees = votes.shape
+    rows = np.arange(n_rows)
+    target = np.searchsorted(forest.classes_, reference)
+
+    counts = np.zeros((n_rows, len(forest.classes_)), dtype=np.int32)
+    for t in range(n_trees):
+        np.add.at(counts, (rows, votes[:, t]), 1)
+
+    starts = np.concatenate(([0], np.cumsum(forest._tree_sizes)))
+    seen, duplicate = set(), []
+    for t in range(n_trees):
+        key = (forest._raw_feature[starts[t]:starts[t + 1]].tobytes(),
+               forest.threshold[starts[t]:starts[t + 1]].tobytes(),
+               forest._raw_right[starts[t]:starts[t + 1]].tobytes())
+        duplicate.append(key in seen)
+        seen.add(key)
+
+    tree_agreement = (votes == target[:, None]).mean(axis=0)
+    order = sorted(range(n_trees), key=lambda t: (not duplicate[t], tree_agreement[t]))
+
+    keep = set(range(n_trees))
+    for t in order:
+        if len(keep) == 1:
+            break
+        trial = counts.copy()
+        trial[rows, votes[:, t]] -= 1
+        if np.mean(trial.argmax(axis=1) == target) >= min_fidelity:
+            counts = trial
+            keep.discard(t)
+
+    return sorted(keep)
+
+def load_reference_data(path, ms, n_samples, seed):
+    """Rows from the training dataset, or uniform samples within the scaler's fitted ranges."""
+    if path and os.path.exists(path):
+        import pandas as pd
+
+        crop = pd.read_csv(path)
+        return crop[FEATURE_NAMES].to_numpy(dtype=float), crop["label"].map(label_map).to_numpy(), path
+
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(ms.data_min_, ms.data_max_, size=(n_samples, len(ms.data_min_)))
+    return X, None, f"{n_samples} uniform samples within the MinMax scaler range"
+
+def measure_startup(script, *args, repeats=3):
+    """Best wall time and peak RSS of a fresh interpreter loading a model and predicting once."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", script, *args], capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        rss_kb = json.loads(out.stdout.strip().splitlines()[-1])["max_rss_kb"]
+        if best is None or elapsed < best[0]:
+            best = (elapsed, rss_kb)
+    return best
+
+def single_row_latency_ms(predict, X, samples=300):
+    predict(X[:1])
+    latencies = []
+    for i in range(samples):
+        row = X[i % len(X):i % len(X) + 1]
+        start = time.perf_counter()
+        predict(row)
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(np.array(latencies) * 1000, 50)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact model.pkl into a NumPy-only binary forest")
+    parser.add_argument("--model", default="model.pkl")
+    parser.add_argument("--standscaler", default="standscaler.pkl")
+    parser.add_argument("--minmaxscaler", default="minmaxscaler.pkl")
+    parser.add_argument("--data", default="Crop_recommendation.csv",
+                        help="training dataset used for pruning and the fidelity report")
+    parser.add_argument("--samples", type=int, default=20000,
+                        help="uniform samples to use when the dataset is not available")
+    parser.add_argument("--min-fidelity", type=float, default=0.995,
+                        help="minimum agreement with the original forest while pruning trees")
+    parser.add_argument("--output", default="model.crpf")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    with open(args.standscaler, "rb") as f:
+        sc = pickle.load(f)
+    with open(args.minmaxscaler, "rb") as f:
+        ms = pickle.load(f)
+
+    if not hasattr(model, "estimators_"):
+        parser.error(f"{args.model} is not a tree ensemble")
+
+    def original_predict(X):
+        return model.predict(sc.transform(ms.transform(X)))
+
+    X, labels, source = load_reference_data(args.data, ms, args.samples, args.seed)
+    # Prune on one half of the data and report fidelity on the other
+    perm = np.random.default_rng(args.seed).permutation(len(X))
+    prune_idx, eval_idx = perm[: len(X) // 2], perm[len(X) // 2:]
+    reference = original_predict(X)
+
+    full = compact_forest(model, ms, sc)
+    full_fidelity = np.mean(full.predict(X[prune_idx]) == reference[prune_idx])
+    keep = prune_trees(full, X[prune_idx], reference[prune_idx], min(args.min_fidelity, full_fidelity))
+    compact = full.subset(keep)
+    save_compact_forest(compact, args.output)
+    compact = load_compact_forest(args.output)
+
+    compact_pred = compact.predict(X[eval_idx])
+    agreement = np.mean(compact_pred == reference[eval_idx])
+    original_nodes = sum(est.tree_.node_count for est in model.estimators_)
+
+    print(f"Reference data: {source}")
+    print(f"Trees:          {len(model.estimators_)} -> {compact.n_trees}")
+    print(f"Nodes:          {original_nodes} -> {compact.n_nodes}")
+    print(f"Fidelity:       {agreement:.4%} agreement with the original forest on {len(eval_idx)} held-out rows")
+
+    mismatched = reference[eval_idx][compact_pred != reference[eval_idx]]
+    if len(mismatched):
+        classes, counts = np.unique(mismatched, return_counts=True)
+        worst = sorted(zip(counts, classes), reverse=True)[:5]
+        print("                most disagreements: " + ", ".join(
+            f"{crop_dict.get(int(c), c)} ({n})" for n, c in worst))
+
+    if labels is not None:
+        original_acc = np.mean(reference[eval_idx] == labels[eval_idx])
+        compact_acc = np.mean(compact_pred == labels[eval_idx])
+        print(f"Accuracy:       original {original_acc:.4%}, compact {compact_acc:.4%}")
+
+    original_size = sum(os.path.getsize(p) for p in (args.model, args.standscaler, args.minmaxscaler))
+    compact_size = os.path.getsize(args.output)
+    print(f"Artifact size:  {original_size / 1024:.1f} KB -> {compact_size / 1024:.1f} KB")
+
+    original_time, original_rss = measure_startup(
+        _ORIGINAL_STARTUP, args.model, args.standscaler, args.minmaxscaler)
+    compact_time, compact_rss = measure_startup(_COMPACT_STARTUP, args.output, ROOT)
+    print(f"Startup time:   {original_time * 1000:.0f} ms -> {compact_time * 1000:.0f} ms "
+          "(fresh interpreter, load and first prediction)")
+    print(f"Peak memory:    {original_rss / 1024:.1f} MB -> {compact_rss / 1024:.1f} MB")
+
+    model.set_params(n_jobs=1)
+    print(f"Latency (p50):  {single_row_latency_ms(original_predict, X):.3f} ms -> "
+          f"{single_row_latency_ms(compact.predict, X):.3f} ms per single-row prediction")
+    print(f"Saved compact model to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""Concurrent load test against a local stack.
+
+Simulates many farmers driving the app through
+login -> recommendation -> chat -> weather -> forum browse/search/post,
+with the external services replaced by local stand-ins:
+
+- Firebase Auth, OpenWeatherMap and Hugging Face are served by a local HTTP
+  server that the app is pointed at via FIREBASE_AUTH_URL,
+  OPENWEATHER_BASE_URL and HUGGINGFACE_API_URL.
+- Firestore is replaced in-process with the fake client from
+  tests/fake_firestore.py, patched into utils.forum.
+
+Each concurrent worker is its own process running sessions one after the
+other: Streamlit's AppTest runtime is not thread-safe, so sessions sharing
+a process would measure the harness instead of the app. Workers share the
+SQLite-backed rate limiter and session spill file, as processes on one
+host do in production; in-memory state (session store, forum fake) is per
+worker. The Flask target starts app.py in the parent process, with a
+stand-in for templates/index.html when the tree doesn't have one.
+
+Every stand-in sleeps for a configurable latency so upstream slowness can be
+simulated. The test ramps through increasing concurrency levels and reports
+throughput, p50/p95/p99 per step and where throughput stops scaling.
+
+Usage:
+    python load_test.py --target streamlit --concurrency 1 2 4 8 16 \\
+        --latency huggingface=800 --latency openweather=150
+    python load_test.py --target flask --concurrency 1 8 32 64
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+
+from tests.fake_firestore import install_fake_firestore
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_LATENCY_MS = {"firebase": 120, "firestore": 60, "openweather": 150, "huggingface": 1500}
+
+SAMPLE_FEATURES = [
+    [90, 42, 43, 20.8, 82.0, 6.5, 202.9],
+    [20, 67, 20, 26.7, 59.0, 7.0, 104.0],
+    [104, 18, 30, 23.6, 60.3, 6.7, 140.9],
+    [0, 17, 30, 35.4, 47.0, 6.3, 92.0],
+]
+
+CHAT_QUESTIONS = [
+    "How often should I irrigate in the first month?",
+    "Which organic fertilizer works best here?",
+    "How do I protect the crop from aphids?",
+]
+
+def _sleep(latency_ms, jitter):
+    if latency_ms:
+        time.sleep(latency_ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Firebase Auth, OpenWeatherMap and Hugging Face stand-ins."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        latency = self.server.latency_ms
+
+        if path.startswith("/v1/accounts:"):
+            _sleep(latency["firebase"], self.server.jitter)
+            payload = self._read_json()
+            self._send_json({
+                "kind": "identitytoolkit#VerifyPasswordResponse",
+                "localId": uuid.uuid4().hex[:28],
+                "email": payload.get("email"),
+                "displayName": "",
+                "idToken": "stand-in-" + "x" * 900,
+                "registered": True,
+                "refreshToken": "stand-in-" + "y" * 200,
+                "expiresIn": "3600",
+            })
+        elif path.startswith("/models/"):
+            _sleep(latency["huggingface"], self.server.jitter)
+            prompt = self._read_json().get("inputs", "")
+            self._send_json([{"generated_text": prompt + "\n\nStand-in agricultural guidance. " * 20}])
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        city = parse_qs(url.query).get("q", ["Hyderabad"])[0]
+        _sleep(self.server.latency_ms["openweather"], self.server.jitter)
+
+        if url.path.endswith("/weather"):
+            self._send_json({
+                "name": city,
+                "sys": {"country": "IN"},
+                "main": {"temp": 29.5, "feels_like": 31.2, "humidity": 64, "pressure": 1008},
+                "weather": [{"description": "scattered clouds"}],
+                "wind": {"speed": 3.6},
+            })
+        elif url.path.endswith("/forecast"):
+            self._send_json({"list": [
+                {
+                    "dt_txt": f"2025-06-01 {hour:02d}:00:00",
+                    "main": {"temp": 27.0 + i, "humidity": 70 - i},
+                    "weather": [{"description": "light rain"}],
+                }
+                for i, hour in enumerate(range(0, 24, 3))
+            ]})
+        else:
+            self._send_json({"cod": "404"}, status=404)
+
+def start_stand_in_server(latency_ms, jitter):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.latency_ms = latency_ms
+    server.jitter = jitter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def step(self, name, fn):
+        start = time.perf_counter()
+        try:
+            ok = fn() is not False
+        except Exception as e:
+            print(f"  {name} failed: {e}")
+            ok = False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.timings[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+        return ok
+
+    def merge(self, timings, errors):
+        with self.lock:
+            for name, values in timings.items():
+                self.timings[name].extend(values)
+            for name, count in errors.items():
+                self.errors[name] += count
+
+def _button(at, label):
+    for button in at.button:
+        if button.label == label:
+            return button
+    raise LookupError(f"No button labelled {label!r}")
+
+def _no_exception(at):
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return True
+
+def streamlit_session(session_id, recorder, app_path, secrets):
+    from streamlit.testing.v1 import AppTest
+    from utils.translations import get_text
+
+    at = AppTest.from_file(app_path, default_timeout=300)
+    for key, value in secrets.items():
+        at.secrets[key] = value
+
+    def load():
+        at.run()
+        return _no_exception(at)
+
+    def login():
+        at.text_input(key="login_email").input(f"farmer{session_id}@example.com")
+        at.text_input(key="login_password").input("harvest-2025")
+        at.button(key="login_btn").click().run()
+        return _no_exception(at)
+
+    def recommendation():
+        features = SAMPLE_FEATURES[session_id % len(SAMPLE_FEATURES)]
+        for number_input, value in zip(at.number_input, features):
+            number_input.set_value(float(value))
+        _button(at, get_text("en", "get_recommendation")).click().run()
+        return _no_exception(at)
+
+    def chat():
+        at.chat_input[0].set_value(random.choice(CHAT_QUESTIONS)).run()
+        return _no_exception(at)
+
+    def weather():
+        at.radio[0].set_value(get_text("en", "weather")).run()
+        at.text_input[0].input(random.choice(["Hyderabad", "Warangal", "Guntur"]))
+        _button(at, get_text("en", "get_weather")).click().run()
+        return _no_exception(at)
+
+    def forum_browse():
+        at.radio[0].set_value(get_text("en", "forums")).run()
+        return _no_exception(at)
+
+    def forum_search():
+        at.text_input(key="forum_search").input(random.choice(["rice", "pest", "fertilizer"])).run()
+        return _no_exception(at)
+
+    def forum_post():
+        at.text_input(key="forum_search").input("").run()
+        at.text_input(key="new_post_name").input(f"Farmer {session_id}")
+        at.text_input(key="new_post_topic").input("Load test discussion topic")
+        at.text_area(key="new_post_message").input("Sharing results from this season's paddy harvest.")
+        at.button(key="submit_post").click().run()
+        return _no_exception(at)
+
+    steps = [
+        ("load", load), ("login", login), ("recommendation", recommendation), ("chat", chat),
+        ("weather", weather), ("forum_browse", forum_browse), ("forum_search", forum_search),
+        ("forum_post", forum_post),
+    ]
+    for name, fn in steps:
+        if not recorder.step(name, fn):
+            return
+
+def flask_session(session_id, recorder, base_url):
+    features = SAMPLE_FEATURES[session_id % len(SAMPLE_FEATURES)]
+    form = dict(zip(
+        ["Nitrogen", "Phosporus", "Potassium", "Temperature", "Humidity", "Ph", "Rainfall"],
+        [str(v) for v in features],
+    ))
+
+    def recommendation():
+        return requests.post(f"{base_url}/predict", data=form, timeout=60).status_code == 200
+
+    recorder.step("recommendation", recommendation)
+
+def check_flask_app(base_url):
+    """Fail fast when /predict doesn't work at all, instead of timing 100% errors."""
+    form = dict(zip(
+        ["Nitrogen", "Phosporus", "Potassium", "Temperature", "Humidity", "Ph", "Rainfall"],
+        [str(v) for v in SAMPLE_FEATURES[0]],
+    ))
+    try:
+        status = requests.post(f"{base_url}/predict", data=form, timeout=60).status_code
+    except requests.RequestException as e:
+        sys.exit(f"Flask app at {base_url} is unreachable: {e}")
+    if status != 200:
+        sys.exit(f"Flask app at {base_url} returned HTTP {status} for /predict; fix it before load testing")
+
+def start_flask_app():
+    from jinja2 import ChoiceLoader, DictLoader
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from app import app
+
+    # app.py renders templates/index.html, which isn't shipped in this tree;
+    # a real template still takes precedence over the stand-in
+    app.jinja_loader = ChoiceLoader([
+        app.jinja_loader,
+        DictLoader({"index.html": "<html><body><p>{{ result }}</p></body></html>"}),
+    ])
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def percentile_ms(values, q):
+    return float(np.percentile(np.array(values) * 1000, q)) if values else float("nan")
+
+def _session_runner(target, options):
+    """Session function for one worker process, after any per-process warm-up."""
+    if target == "flask":
+        return lambda i, recorder: flask_session(i, recorder, options["base_url"])
+
+    # One warm-up session imports the app modules so the Firestore fake can be patched in
+    streamlit_session(-1, Recorder(), options["app_path"], options["secrets"])
+    install_fake_firestore(options["firestore_latency"], options["jitter"])
+    return lambda i, recorder: streamlit_session(i, recorder, options["app_path"], options["secrets"])
+
+def _worker(target, options, session_ids, ready, start, results):
+    session_fn = _session_runner(target, options)
+    ready.put(True)
+    start.wait()
+
+    recorder = Recorder()
+    for i in session_ids:
+        try:
+            session_fn(i, recorder)
+        except Exception as e:
+            print(f"  session crashed: {e}")
+    stats = None
+    if target == "streamlit":
+        from utils.session_store import get_session_store
+
+        stats = get_session_store().stats()
+    results.put((dict(recorder.timings), dict(recorder.errors), stats))
+
+def _collect(q, workers, n):
+    """Up to ``n`` items from ``q``, giving up once every worker has exited."""
+    items = []
+    while len(items) < n:
+        try:
+            items.append(q.get(timeout=1))
+        except queue.Empty:
+            if not any(p.is_alive() for p in workers):
+                break
+    return items
+
+def run_level(concurrency, sessions, target, options):
+    """Run ``sessions`` sessions on ``concurrency`` worker processes.
+
+    Workers start and warm up before the clock starts, so interpreter and
+    app import time is not counted. Returns the merged recorder, the elapsed
+    time and each worker's session store stats.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    ready, results = ctx.Queue(), ctx.Queue()
+    start = ctx.Event()
+    workers = [
+        ctx.Process(target=_worker, daemon=True,
+                    args=(target, options, list(range(w, sessions, concurrency)), ready, start, results))
+        for w in range(concurrency)
+    ]
+    for p in workers:
+        p.start()
+    n_ready = len(_collect(ready, workers, concurrency))
+
+    started = time.perf_counter()
+    start.set()
+    outputs = _collect(results, workers, n_ready)
+    elapsed = time.perf_counter() - started
+    for p in workers:
+        p.join()
+
+    recorder = Recorder()
+    missing = concurrency - len(outputs)
+    if missing:
+        print(f"  {missing} worker process(es) crashed")
+        recorder.errors["worker_crashed"] += missing
+    for timings, errors, _ in outputs:
+        recorder.merge(timings, errors)
+    return recorder, elapsed, [stats for _, _, stats in outputs if stats]
+
+def print_level(concurrency, sessions, recorder, elapsed):
+    total_steps = sum(len(v) for v in recorder.timings.values())
+    total_errors = sum(recorder.errors.values())
+    print(f"\n=== concurrency {concurrency}: {sessions} sessions in {elapsed:.1f}s, "
+          f"{sessions / elapsed:.2f} sessions/s, {total_steps / elapsed:.2f} steps/s, "
+          f"{total_errors} errors ===")
+    print(f"{'step':<16} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, values in recorder.timings.items():
+        print(f"{name:<16} {len(values):>6} {recorder.errors[name]:>6} "
+              f"{percentile_ms(values, 50):>9.1f} {percentile_ms(values, 95):>9.1f} "
+              f"{percentile_ms(values, 99):>9.1f}")
+
+def parse_latency(items):
+    latency = dict(DEFAULT_LATENCY_MS)
+    for item in items or []:
+        name, _, value = item.partition("=")
+        if name not in latency:
+            raise argparse.ArgumentTypeError(f"Unknown upstream {name!r}, expected one of {', '.join(latency)}")
+        latency[name] = float(value)
+    return latency
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the crop recommendation apps against local stand-ins")
+    parser.add_argument("--target", choices=["streamlit", "flask"], default="streamlit")
+    parser.add_argument("--flask-url", help="drive an already running app.py instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--sessions-per-worker", type=int, default=2,
+                        help="sessions run at each level, per concurrent worker")
+    parser.add_argument("--latency", action="append", metavar="UPSTREAM=MS",
+                        help=f"injected upstream latency (defaults: {DEFAULT_LATENCY_MS})")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter")
+    parser.add_argument("--saturation-gain", type=float, default=0.1,
+                        help="throughput gain below which the previous level counts as saturated")
+    args = parser.parse_args()
+    latency = parse_latency(args.latency)
+
+    server = start_stand_in_server(latency, args.jitter)
+    stand_in_url = f"http://127.0.0.1:{server.server_port}"
+    # Must be set before the app modules are imported
+    os.environ["FIREBASE_AUTH_URL"] = f"{stand_in_url}/v1"
+    os.environ["OPENWEATHER_BASE_URL"] = f"{stand_in_url}/data/2.5"
+    os.environ["HUGGINGFACE_API_URL"] = f"{stand_in_url}/models/mistralai/Mistral-7B-Instruct-v0.2"
+    # Fresh limiter and session state, so buckets don't carry over from earlier runs
+    state_dir = tempfile.mkdtemp(prefix="load_test_")
+    os.environ["RATE_LIMIT_DB"] = os.path.join(state_dir, "rate_limit.sqlite3")
+    os.environ["SESSION_SPILL_DB"] = os.path.join(state_dir, "sessions.sqlite3")
+    os.chdir(ROOT)
+    print(f"Stand-in services on {stand_in_url}, latency (ms): {latency}")
+
+    if args.target == "streamlit":
+        secrets = {
+            "FIREBASE_APIKEY": "stand-in",
+            "openweather_Apikey": "stand-in",
+            "HUGGINGFACE_API_TOKEN": "stand-in",
+            "FIREBASE_SERVICE_ACCOUNT_KEY": "",
+        }
+        options = {
+            "app_path": os.path.join(ROOT, "app_enhanced.py"),
+            "secrets": secrets,
+            "firestore_latency": latency["firestore"],
+            "jitter": args.jitter,
+        }
+    else:
+        base_url = args.flask_url or start_flask_app()
+        check_flask_app(base_url)
+        options = {"base_url": base_url}
+
+    summary = []
+    store_stats = []
+    for concurrency in args.concurrency:
+        sessions = concurrency * args.sessions_per_worker
+        recorder, elapsed, store_stats = run_level(concurrency, sessions, args.target, options)
+        print_level(concurrency, sessions, recorder, elapsed)
+        all_timings = [t for values in recorder.timings.values() for t in values]
+        summary.append({
+            "concurrency": concurrency,
+            "throughput": sessions / elapsed,
+            "p95_ms": percentile_ms(all_timings, 95),
+            "error_rate": sum(recorder.errors.values()) / max(len(all_timings), 1),
+        })
+
+    print(f"\n{'concurrency':>11} {'sessions/s':>11} {'p95 ms':>9} {'errors':>7}")
+    saturation = None
+    for prev, level in zip([None] + summary, summary):
+        print(f"{level['concurrency']:>11} {level['throughput']:>11.2f} {level['p95_ms']:>9.1f} "
+              f"{level['error_rate']:>7.1%}")
+        if saturation is None and prev is not None and (
+            level["throughput"] < prev["throughput"] * (1 + args.saturation_gain)
+            or level["error_rate"] > 0.05
+        ):
+            saturation = prev["concurrency"]
+
+    if store_stats:
+        # Each worker of the last level has its own in-memory store; the spill file is shared
+        in_memory = sum(stats["sessions_in_memory"] for stats in store_stats)
+        memory_bytes = sum(stats["memory_bytes"] for stats in store_stats)
+        largest = max(stats["largest_session_bytes"] for stats in store_stats)
+        spilled = store_stats[0]
+        print(f"\nSession store ({len(store_stats)} workers): {in_memory} sessions in memory "
+              f"({memory_bytes / 1024:.1f} KB, largest {largest / 1024:.1f} KB), "
+              f"{spilled['sessions_spilled']} spilled ({spilled['spilled_bytes'] / 1024:.1f} KB)")
+
+    if saturation is not None:
+        print(f"\nThroughput stops scaling beyond ~{saturation} concurrent sessions")
+    else:
+        print("\nNo saturation point reached; try higher --concurrency levels")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""HTTP ingestion endpoint for IoT soil-sensor readings.
+
+Readings are accepted over HTTP, handed to a local stand-in broker and
+consumed by the streaming pipeline in utils/sensor_stream.py, which keeps
+the latest crop recommendation per field.
+
+Endpoints:
+    POST /readings              JSON list of readings, or one JSON object per line
+    POST /fields/<id>/rainfall  {"rainfall": 180.0}
+    GET  /fields                latest recommendation for every field
+    GET  /fields/<id>           latest recommendation for one field
+    GET  /stats                 pipeline counters
+    GET  /drift                 input drift scores and alerts (see utils/drift.py)
+
+A reading looks like:
+    {"field_id": "plot-17", "N": 90, "P": 42, "K": 43, "temperature": 20.8,
+     "humidity": 82, "ph": 6.5, "ts": 1717400000}
+
+Usage:
+    python sensor_ingest.py --port 8600
+    python sensor_ingest.py --benchmark 500000 --fields 2000
+"""
+import argparse
+import json
+import pickle
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.drift import get_drift_monitor
+from utils.sensor_stream import (
+    READINGS_TOPIC,
+    LocalBroker,
+    RecommendationStore,
+    SensorPipeline,
+    make_predictor,
+)
+
+class IngestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        try:
+            body = self._read_body()
+            if parts == ["readings"]:
+                text = body.decode().strip()
+                if text.startswith("["):
+                    readings = json.loads(text)
+                else:
+                    readings = [json.loads(line) for line in text.splitlines() if line.strip()]
+                self.server.broker.publish(READINGS_TOPIC, readings)
+                self._send_json({"accepted": len(readings)}, status=202)
+            elif len(parts) == 3 and parts[0] == "fields" and parts[2] == "rainfall":
+                self.server.pipeline.set_field_rainfall(parts[1], float(json.loads(body)["rainfall"]))
+                self._send_json({"field_id": parts[1]})
+            else:
+                self._send_json({"error": "not found"}, status=404)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json({"error": f"invalid request: {e}"}, status=400)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["fields"]:
+            self._send_json(self.server.store.all())
+        elif len(parts) == 2 and parts[0] == "fields":
+            rec = self.server.store.get(parts[1])
+            if rec:
+                self._send_json(rec)
+            else:
+                self._send_json({"error": "no recommendation for this field yet"}, status=404)
+        elif parts == ["stats"]:
+            self._send_json({**self.server.pipeline.stats, "fields": len(self.server.pipeline.fields)})
+        elif parts == ["drift"]:
+            self._send_json(self.server.monitor.report())
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+def load_predictor(args):
+    """Predictor, drift monitor and per-feature ranges (for the change threshold).
+
+    The scalers are loaded even for a compact model, whose thresholds already
+    have them folded in, because they describe the training data.
+    """
+    with open(args.minmaxscaler, "rb") as f:
+        ms = pickle.load(f)
+    with open(args.standscaler, "rb") as f:
+        sc = pickle.load(f)
+    ranges = list(ms.data_max_ - ms.data_min_)
+
+    if args.compact_model:
+        from utils.compact_forest import load_compact_forest
+
+        model = load_compact_forest(args.compact_model)
+        monitor = get_drift_monitor(sc, ms, model)
+        return make_predictor(model, monitor=monitor), monitor, ranges
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    monitor = get_drift_monitor(sc, ms, model)
+    return make_predictor(model, sc, ms, monitor=monitor), monitor, ranges
+
+def synthetic_readings(n, n_fields, seed=42):
+    """Readings drifting slowly around a per-field baseline."""
+    rng = random.Random(seed)
+    baselines = [
+        [rng.uniform(0, 140), rng.uniform(5, 145), rng.uniform(5, 205),
+         rng.uniform(10, 40), rng.uniform(20, 95), rng.uniform(4.5, 8.5)]
+        for _ in range(n_fields)
+    ]
+    start = time.time()
+    for i in range(n):
+        field = i % n_fields
+        base = baselines[field]
+        yield {
+            "field_id": f"field-{field}",
+            "N": base[0] + rng.gauss(0, 2), "P": base[1] + rng.gauss(0, 2), "K": base[2] + rng.gauss(0, 2),
+            "temperature": base[3] + rng.gauss(0, 0.3), "humidity": base[4] + rng.gauss(0, 1),
+            "ph": base[5] + rng.gauss(0, 0.05), "ts": start + i * 0.001,
+        }
+
+def run_benchmark(pipeline, broker, monitor, n, n_fields, batch_size=1000):
+    """Push ``n`` synthetic readings through the broker and report sustained throughput."""
+    batch = []
+    readings = list(synthetic_readings(n, n_fields))
+    pipeline.start(broker, flush_interval=0.5)
+
+    start = time.perf_counter()
+    for reading in readings:
+        batch.append(reading)
+        if len(batch) == batch_size:
+            broker.publish(READINGS_TOPIC, batch)
+            batch = []
+    if batch:
+        broker.publish(READINGS_TOPIC, batch)
+    while pipeline.stats["readings"] + pipeline.stats["rejected"] < n:
+        time.sleep(0.01)
+    pipeline.stop()
+    elapsed = time.perf_counter() - start
+
+    stats = pipeline.stats
+    print(f"Ingested {stats['readings']} readings for {n_fields} fields in {elapsed:.2f}s "
+          f"({stats['readings'] / elapsed:,.0f} readings/s)")
+    print(f"Model runs: {stats['evaluations']} field evaluations in {stats['batches']} batches "
+          f"({stats['evaluations'] / max(stats['readings'], 1):.2%} of readings)")
+    for alert in monitor.report()["alerts"]:
+        print(f"Drift alert: {alert}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest soil-sensor readings and keep per-field recommendations")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--model", default="model.pkl")
+    parser.add_argument("--standscaler", default="standscaler.pkl")
+    parser.add_argument("--minmaxscaler", default="minmaxscaler.pkl")
+    parser.add_argument("--compact-model", help="use a compact forest (see compact_model.py) instead of model.pkl")
+    parser.add_argument("--db", default="field_recommendations.sqlite3", help="recommendation store")
+    parser.add_argument("--window", type=float, default=900.0, help="sliding window length in seconds")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="re-run the model when a windowed feature moves by this fraction of its range")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="push N synthetic readings through the pipeline and report throughput")
+    parser.add_argument("--fields", type=int, default=1000, help="number of fields in the benchmark")
+    args = parser.parse_args()
+
+    predict, monitor, ranges = load_predictor(args)
+    broker = LocalBroker()
+    store = RecommendationStore(":memory:" if args.benchmark else args.db)
+    pipeline = SensorPipeline(predict, store, window_seconds=args.window,
+                              change_threshold=args.threshold, feature_ranges=ranges)
+
+    if args.benchmark:
+        run_benchmark(pipeline, broker, monitor, args.benchmark, args.fields)
+        return
+
+    pipeline.start(broker)
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), IngestHandler)
+    server.broker = broker
+    server.pipeline = pipeline
+    server.store = store
+    server.monitor = monitor
+    print(f"Accepting sensor readings on http://0.0.0.0:{args.port}/readings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""In-process Firestore stand-in for utils.forum, used by the forum tests and load_test.py.
+
+Covers the parts of the client the forum uses: collections, documents,
+ordered/limited streams, batched writes (atomic, like Firestore) and
+SERVER_TIMESTAMP/Increment transforms. Every RPC sleeps for a configurable
+latency so load tests can simulate a slow backend.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from types import SimpleNamespace
+
+def _sleep(latency_ms, jitter):
+    if latency_ms:
+        time.sleep(latency_ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+class FakeFirestore:
+    """In-process stand-in for the parts of the Firestore client used by utils.forum."""
+
+    SERVER_TIMESTAMP = object()
+
+    class Increment:
+        def __init__(self, value):
+            self.value = value
+
+    Query = SimpleNamespace(DESCENDING="DESCENDING", ASCENDING="ASCENDING")
+
+    def __init__(self, latency_ms, jitter):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.collections = defaultdict(dict)
+
+    def rpc(self):
+        _sleep(self.latency_ms, self.jitter)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+class NotFound(Exception):
+    """Raised like google.api_core.exceptions.NotFound when updating a missing document."""
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref, ref._apply_set, data))
+
+    def update(self, ref, data):
+        self.writes.append((ref, ref._apply_update, data))
+
+    def commit(self):
+        self.client.rpc()
+        with self.client.lock:
+            # Atomic like Firestore: check every update's target before applying anything
+            created = set()
+            for ref, apply, _ in self.writes:
+                if apply == ref._apply_set:
+                    created.add(ref.path)
+                elif ref.path not in created and not ref._exists():
+                    raise NotFound(f"No document to update: {ref.path}")
+            for _, apply, data in self.writes:
+                apply(data)
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+class FakeCollection:
+    def __init__(self, client, path, order=None, limit=None):
+        self.client = client
+        self.path = path
+        self._order = order
+        self._limit = limit
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.client, self.path, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, data):
+        doc = self.document()
+        doc.set(data)
+        return None, doc
+
+    def order_by(self, field, direction="ASCENDING"):
+        return FakeCollection(self.client, self.path, (field, direction), self._limit)
+
+    def limit(self, count):
+        return FakeCollection(self.client, self.path, self._order, count)
+
+    def stream(self):
+        self.client.rpc()
+        with self.client.lock:
+            docs = [FakeSnapshot(doc_id, data) for doc_id, data in self.client.collections[self.path].items()]
+        if self._order:
+            field, direction = self._order
+            docs.sort(key=lambda d: d._data.get(field), reverse=direction == "DESCENDING")
+        return iter(docs[: self._limit] if self._limit else docs)
+
+class FakeDocument:
+    def __init__(self, client, collection_path, doc_id):
+        self.client = client
+        self.collection_path = collection_path
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self.collection_path}/{self.id}"
+
+    def _exists(self):
+        return self.id in self.client.collections[self.collection_path]
+
+    def collection(self, name):
+        return FakeCollection(self.client, f"{self.path}/{name}")
+
+    def _resolve(self, data, current=None):
+        resolved = {}
+        for key, value in data.items():
+            if value is FakeFirestore.SERVER_TIMESTAMP:
+                value = datetime.now()
+            elif isinstance(value, FakeFirestore.Increment):
+                value = (current or {}).get(key, 0) + value.value
+            resolved[key] = value
+        return resolved
+
+    def _apply_set(self, data):
+        self.client.collections[self.collection_path][self.id] = self._resolve(data)
+
+    def _apply_update(self, data):
+        docs = self.client.collections[self.collection_path]
+        if self.id not in docs:
+            raise NotFound(f"No document to update: {self.path}")
+        current = docs[self.id]
+        current.update(self._resolve(data, current))
+        docs[self.id] = current
+
+    def set(self, data):
+        self.client.rpc()
+        with self.client.lock:
+            self._apply_set(data)
+
+    def update(self, data):
+        self.client.rpc()
+        with self.client.lock:
+            self._apply_update(data)
+
+def install_fake_firestore(latency_ms, jitter):
+    """Point utils.forum at the in-process Firestore stand-in."""
+    from utils import forum
+
+    fake = FakeFirestore(latency_ms, jitter)
+    forum.db = fake
+    forum.firestore = FakeFirestore
+    return fake
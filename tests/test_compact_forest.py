@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from compact_model import compact_forest, scaler_affine
+from utils.compact_forest import from_bytes, load_compact_forest, save_compact_forest
+
+LOW = np.array([0, 5, 5, 10, 14, 3.5, 20])
+HIGH = np.array([140, 145, 205, 44, 100, 9.9, 299])
+
+@pytest.fixture(scope="module")
+def fitted():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(LOW, HIGH, size=(600, len(LOW)))
+    y = 1 + (X[:, 0] > 70) + 2 * (X[:, 6] > 150) + 4 * (X[:, 5] > 6.5)
+    ms = MinMaxScaler()
+    sc = StandardScaler()
+    model = RandomForestClassifier(n_estimators=15, random_state=0)
+    model.fit(sc.fit_transform(ms.fit_transform(X)), y)
+    return model, ms, sc
+
+def _samples(n=2000, seed=1):
+    return np.random.default_rng(seed).uniform(LOW, HIGH, size=(n, len(LOW)))
+
+def test_scaler_affine_folds_both_scalers(fitted):
+    _, ms, sc = fitted
+    X = _samples(50)
+    a, b = scaler_affine(ms, sc)
+
+    assert np.allclose(a * X + b, sc.transform(ms.transform(X)))
+
+def test_thresholds_are_in_raw_units(fitted):
+    model, ms, sc = fitted
+    a, b = scaler_affine(ms, sc)
+    tree = model.estimators_[0].tree_
+    forest = compact_forest(model, ms, sc)
+
+    # The root split is the first node of the first tree in both forests
+    f = tree.feature[0]
+    assert forest.feature[0] == f
+    assert forest.threshold[0] == pytest.approx((tree.threshold[0] - b[f]) / a[f], rel=1e-6)
+    assert LOW[f] <= forest.threshold[0] <= HIGH[f]
+
+def test_predict_matches_sklearn_forest(fitted):
+    model, ms, sc = fitted
+    X = _samples()
+    forest = compact_forest(model, ms, sc)
+
+    assert np.array_equal(forest.predict(X), model.predict(sc.transform(ms.transform(X))))
+
+def test_save_and_load_round_trip(fitted, tmp_path):
+    model, ms, sc = fitted
+    forest = compact_forest(model, ms, sc)
+    path = tmp_path / "model.crpf"
+    save_compact_forest(forest, path)
+    loaded = load_compact_forest(path)
+
+    assert loaded.n_trees == forest.n_trees and loaded.n_nodes == forest.n_nodes
+    assert np.array_equal(loaded.classes_, forest.classes_)
+    assert np.array_equal(loaded.predict(_samples()), forest.predict(_samples()))
+    assert loaded.subset([0, 2]).to_bytes() == forest.subset([0, 2]).to_bytes()
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        from_bytes(b"PK\x03\x04" + bytes(16))
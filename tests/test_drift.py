@@ -0,0 +1,79 @@
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.crops import FEATURE_NAMES
+from utils.drift import (
+    OUT_OF_RANGE_ALERT,
+    DriftMonitor,
+    class_reference,
+    load_training_stats,
+    save_training_stats,
+    training_reference,
+)
+
+def _load(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def test_unfitted_standard_scaler_falls_back_to_minmax_range():
+    sc = _load("standscaler.pkl")
+    ms = _load("minmaxscaler.pkl")
+    ref = training_reference(sc, ms)
+
+    assert np.allclose(ref["mean"], (ms.data_min_ + ms.data_max_) / 2)
+    assert np.allclose(ref["std"], (ms.data_max_ - ms.data_min_) / 2)
+
+def test_fitted_standard_scaler_is_mapped_back_to_raw_units():
+    ms = SimpleNamespace(data_min_=np.array([0.0]), data_max_=np.array([10.0]),
+                         min_=np.array([0.0]), scale_=np.array([0.1]))
+    sc = SimpleNamespace(mean_=np.array([0.4]), var_=np.array([0.04]), n_samples_seen_=100)
+    ref = training_reference(sc, ms)
+
+    assert np.allclose(ref["mean"], [4.0])
+    assert np.allclose(ref["std"], [2.0])
+
+def _monitor_report(X):
+    sc = _load("standscaler.pkl")
+    ms = _load("minmaxscaler.pkl")
+    model = _load("model.pkl")
+    monitor = DriftMonitor(training_reference(sc, ms, load_training_stats()), *class_reference(model))
+    monitor.record(X, model.predict(sc.transform(ms.transform(X))))
+    return monitor.report()
+
+def _training_like(n=300):
+    stats = load_training_stats()
+    ms = _load("minmaxscaler.pkl")
+    X = np.random.default_rng(0).normal(stats["mean"], stats["std"], size=(n, len(stats["mean"])))
+    return np.clip(X, ms.data_min_, ms.data_max_)
+
+def test_shipped_training_stats_are_used():
+    stats = load_training_stats()
+    ref = training_reference(_load("standscaler.pkl"), _load("minmaxscaler.pkl"), stats)
+
+    assert stats["rows"] == 2100
+    assert np.allclose(ref["mean"], stats["mean"]) and np.allclose(ref["std"], stats["std"])
+
+def test_training_like_inputs_raise_no_feature_alerts():
+    report = _monitor_report(_training_like())
+
+    assert all(f["score"] < 1 for f in report["features"].values())
+
+def test_in_range_mean_shift_raises_an_alert():
+    X = _training_like()
+    X[:, FEATURE_NAMES.index("temperature")] += 6
+    report = _monitor_report(X)
+
+    assert report["features"]["temperature"]["out_of_range"] < OUT_OF_RANGE_ALERT
+    assert any(alert.startswith("temperature: mean") for alert in report["alerts"])
+
+def test_save_and_load_training_stats(tmp_path):
+    X = np.arange(28, dtype=float).reshape(4, 7)
+    path = tmp_path / "training_stats.json"
+    save_training_stats(X, path, source="test")
+    stats = load_training_stats(path)
+
+    assert np.allclose(stats["mean"], X.mean(axis=0))
+    assert np.allclose(stats["std"], X.std(axis=0, ddof=1))
+    assert load_training_stats(tmp_path / "missing.json") is None
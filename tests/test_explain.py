@@ -0,0 +1,47 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from utils.explain import explain_predictions, supports_attribution
+
+@pytest.fixture(scope="module")
+def shipped():
+    with open("model.pkl", "rb") as f:
+        model = pickle.load(f)
+    with open("standscaler.pkl", "rb") as f:
+        sc = pickle.load(f)
+    with open("minmaxscaler.pkl", "rb") as f:
+        ms = pickle.load(f)
+    rng = np.random.default_rng(0)
+    X = rng.uniform(ms.data_min_, ms.data_max_, size=(200, len(ms.data_min_)))
+    return model, sc.transform(ms.transform(X))
+
+def test_contributions_sum_to_predict_proba(shipped):
+    model, X = shipped
+    proba, contributions, bias = explain_predictions(model, X)
+
+    assert contributions.shape == (len(X), model.n_features_in_, len(model.classes_))
+    assert np.allclose(bias + contributions.sum(axis=1), model.predict_proba(X))
+    assert np.allclose(proba, model.predict_proba(X))
+
+def test_batch_matches_row_by_row(shipped):
+    model, X = shipped
+    proba, contributions, bias = explain_predictions(model, X[:25])
+
+    for i, row in enumerate(X[:25]):
+        row_proba, row_contributions, row_bias = explain_predictions(model, row)
+        assert np.allclose(row_proba[0], proba[i])
+        assert np.allclose(row_contributions[0], contributions[i])
+        assert np.allclose(row_bias, bias)
+
+def test_single_tree():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] + X[:, 2] > 0).astype(int) + (X[:, 1] > 1)
+    tree = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y)
+    proba, contributions, bias = explain_predictions(tree, X)
+
+    assert supports_attribution(tree)
+    assert np.allclose(bias + contributions.sum(axis=1), tree.predict_proba(X))
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from tests.fake_firestore import install_fake_firestore
+from utils import forum
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    for name, value in {
+        "_write_queue": forum.queue.Queue(), "_writer_thread": None, "_stopping": threading.Event(),
+        "_local_posts": {}, "_local_replies": {}, "_feed_cache": {},
+        "_failed_writes": forum.deque(maxlen=1000), "FLUSH_INTERVAL": 0.05,
+    }.items():
+        monkeypatch.setattr(forum, name, value)
+    monkeypatch.setattr(forum, "firestore", None, raising=False)
+    monkeypatch.setattr(forum, "db", None)
+    return install_fake_firestore(0, 0)
+
+def _wait_for_writer(timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        items = list(forum._local_posts.values()) + [r for rs in forum._local_replies.values() for r in rs]
+        if forum._write_queue.empty() and not any(item["pending"] for item in items):
+            return
+        time.sleep(0.01)
+    raise AssertionError("forum writes still pending")
+
+def _stored(fake, path):
+    return fake.collections[path]
+
+def test_posts_and_replies_are_written_in_one_batch(fake_db):
+    assert forum.add_forum_post("Ravi", "Paddy harvest", "Yields were good this year")[0]
+    post_id = next(iter(forum._local_posts))
+    assert forum.add_reply(post_id, "Lakshmi", "Congratulations!")[0]
+    _wait_for_writer()
+
+    assert _stored(fake_db, "forum_posts")[post_id]["reply_count"] == 1
+    assert len(_stored(fake_db, f"forum_posts/{post_id}/replies")) == 1
+    assert forum.get_failed_writes() == []
+
+def test_one_bad_write_does_not_drop_the_rest_of_the_batch(fake_db):
+    # Reply to a post that no longer exists: its reply_count update fails
+    assert forum.add_reply("deleted-post", "Suresh", "Is this still relevant?")[0]
+    assert forum.add_forum_post("Ravi", "Cotton pests", "Bollworm is back in our area")[0]
+    post_id = next(iter(forum._local_posts))
+    _wait_for_writer()
+
+    assert post_id in _stored(fake_db, "forum_posts")
+    assert not forum._local_posts[post_id].get("failed")
+
+    failed = forum.get_failed_writes()
+    assert [(f["kind"], f["post_id"]) for f in failed] == [("reply", "deleted-post")]
+    assert "No document to update" in failed[0]["error"]
+    assert forum._local_replies["deleted-post"][0]["failed"]
+
+def test_queued_writes_are_flushed_at_exit(fake_db, monkeypatch):
+    monkeypatch.setattr(forum, "FLUSH_INTERVAL", 30)
+    assert forum.add_forum_post("Ravi", "Mango flowering", "Early flowering this season")[0]
+    post_id = next(iter(forum._local_posts))
+
+    forum._flush_at_exit()
+    assert post_id in _stored(fake_db, "forum_posts")
+    assert not forum._writer_thread.is_alive()
+
+def test_stale_search_feed_does_not_block_pruning(fake_db):
+    # A search long ago cached the limit-1000 feed; it must not pin local items forever
+    forum._feed_cache[1000] = (time.time() - forum.FEED_CACHE_TTL - 1, [])
+    assert forum.add_forum_post("Ravi", "Drip irrigation", "Subsidy forms are out now")[0]
+    post_id = next(iter(forum._local_posts))
+    _wait_for_writer()
+
+    posts = forum.get_forum_posts(15)
+    assert [p["id"] for p in posts] == [post_id]
+    assert forum._local_posts == {}
+    assert 1000 not in forum._feed_cache
+
+def test_failed_items_are_pruned_after_their_ttl(fake_db, monkeypatch):
+    assert forum.add_reply("deleted-post", "Suresh", "Is this still relevant?")[0]
+    _wait_for_writer()
+    forum.get_forum_posts(15)
+    assert forum._local_replies["deleted-post"][0]["failed"]
+
+    monkeypatch.setattr(forum, "FAILED_ITEM_TTL", 0)
+    forum._feed_cache.clear()
+    forum.get_forum_posts(15)
+    assert forum._local_replies == {}
+    assert len(forum.get_failed_writes()) == 1
@@ -0,0 +1,98 @@
+import json
+import sys
+
+import pytest
+
+import build_insights
+from utils.insights import all_buckets, build_knowledge_base, get_crop_insight
+
+CROPS = ["Rice", "Maize"]
+LANGS = ["en", "te"]
+DOCS = len(CROPS) * len(LANGS) * 27
+
+class FakeGenerator:
+    """Stands in for the Mistral call; fails every prompt containing ``fail_on``."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        if self.fail_on and self.fail_on in prompt:
+            return None
+        return f"  insight #{self.calls}  "
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["insights"]
+
+def test_builds_one_document_per_crop_language_and_bucket(tmp_path):
+    path = str(tmp_path / "insights.json")
+    generate = FakeGenerator()
+
+    assert len(all_buckets()) == 27
+    assert build_knowledge_base(generate, CROPS, LANGS, path=path) == (DOCS, 0, 0)
+    assert generate.calls == DOCS
+
+    insights = _load(path)
+    assert sum(len(buckets) for crop in insights.values() for buckets in crop.values()) == DOCS
+    # Served by bucket: 20.8°C is warm, 202.9 mm is high rainfall, pH 6.5 is neutral
+    doc = get_crop_insight("Rice", [90, 42, 43, 20.8, 82, 6.5, 202.9], "te", path=path)
+    assert doc == insights["Rice"]["te"]["warm-high-neutral"]
+    assert doc == doc.strip()
+
+def test_rerun_skips_existing_documents(tmp_path):
+    path = str(tmp_path / "insights.json")
+    build_knowledge_base(FakeGenerator(), CROPS, LANGS, path=path)
+    before = _load(path)
+
+    generate = FakeGenerator()
+    assert build_knowledge_base(generate, CROPS, LANGS, path=path) == (0, DOCS, 0)
+    assert generate.calls == 0
+    assert _load(path) == before
+
+def test_rebuild_regenerates_everything(tmp_path):
+    path = str(tmp_path / "insights.json")
+    build_knowledge_base(FakeGenerator(), CROPS, LANGS, path=path)
+
+    generate = FakeGenerator()
+    assert build_knowledge_base(generate, CROPS, LANGS, path=path, rebuild=True) == (DOCS, 0, 0)
+    assert generate.calls == DOCS
+
+def test_failures_are_counted_and_retried_on_next_run(tmp_path):
+    path = str(tmp_path / "insights.json")
+    # Every bucket with high rainfall fails: 9 of the 27
+    failing = FakeGenerator(fail_on="high rainfall")
+    assert build_knowledge_base(failing, CROPS, LANGS, path=path) == (DOCS * 2 // 3, 0, DOCS // 3)
+    assert "warm-high-neutral" not in _load(path)["Rice"]["en"]
+
+    assert build_knowledge_base(FakeGenerator(), CROPS, LANGS, path=path) == (DOCS // 3, DOCS * 2 // 3, 0)
+    assert "warm-high-neutral" in _load(path)["Rice"]["en"]
+
+def test_cli_rebuild_flag(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "insights.json")
+    generators = []
+
+    def fake_generator(api_token):
+        generators.append(FakeGenerator())
+        return generators[-1]
+
+    monkeypatch.setenv("HUGGINGFACE_API_TOKEN", "test-token")
+    monkeypatch.setattr(build_insights, "make_mistral_generator", fake_generator)
+
+    def run(*extra):
+        monkeypatch.setattr(sys, "argv", ["build_insights.py", "--output", path, "--crops", *CROPS, *extra])
+        build_insights.main()
+
+    run()
+    run()
+    run("--rebuild")
+    assert [g.calls for g in generators] == [DOCS, 0, DOCS]
+    assert f"Generated {DOCS}, kept 0, failed 0" in capsys.readouterr().out
+
+def test_cli_requires_api_token(monkeypatch):
+    monkeypatch.delenv("HUGGINGFACE_API_TOKEN", raising=False)
+    monkeypatch.setattr(sys, "argv", ["build_insights.py"])
+    with pytest.raises(SystemExit):
+        build_insights.main()
@@ -0,0 +1,43 @@
+from utils.prefetch import InsightPrefetcher
+
+def _wait(prefetcher):
+    for future in prefetcher.futures.values():
+        future.exception()
+
+def test_prefetched_insight_is_a_hit():
+    prefetcher = InsightPrefetcher()
+    prefetcher.start("key", ["Maize"], lambda crop: f"{crop} insight")
+    _wait(prefetcher)
+
+    assert prefetcher.get("key", "Maize", lambda crop: "on demand") == "Maize insight"
+    assert (prefetcher.hits, prefetcher.misses) == (1, 0)
+
+def test_failed_prefetch_is_regenerated_on_demand():
+    def failing(crop):
+        if crop == "Jute":
+            raise RuntimeError("upstream down")
+        return None
+
+    prefetcher = InsightPrefetcher()
+    prefetcher.start("key", ["Maize", "Jute"], failing)
+    _wait(prefetcher)
+
+    calls = []
+    def generate(crop):
+        calls.append(crop)
+        return f"{crop} on demand"
+
+    assert prefetcher.get("key", "Maize", generate) == "Maize on demand"
+    assert prefetcher.get("key", "Jute", generate) == "Jute on demand"
+    assert prefetcher.get("key", "Jute", generate) == "Jute on demand"
+    assert calls == ["Maize", "Jute", "Jute"]
+    assert (prefetcher.hits, prefetcher.misses) == (0, 3)
+
+def test_new_key_cancels_previous_batch():
+    prefetcher = InsightPrefetcher()
+    prefetcher.start(("features", "en"), ["Maize"], lambda crop: "english")
+    prefetcher.start(("features", "te"), ["Maize"], lambda crop: "telugu")
+    _wait(prefetcher)
+
+    assert prefetcher.key == ("features", "te")
+    assert prefetcher.get(("features", "te"), "Maize", lambda crop: "on demand") == "telugu"
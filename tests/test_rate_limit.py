@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from utils import rate_limit
+
+@pytest.fixture(autouse=True)
+def limiter_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_DB", str(tmp_path / "rate_limit.sqlite3"))
+    monkeypatch.setattr(rate_limit, "_local", rate_limit.threading.local())
+
+def test_burst_then_rate_limited():
+    burst = rate_limit.UPSTREAM_LIMITS["huggingface"]["burst"]
+    for _ in range(burst):
+        with rate_limit.admission("huggingface", "farmer@example.com") as rejected:
+            assert rejected is None
+    with rate_limit.admission("huggingface", "farmer@example.com") as rejected:
+        assert rejected == rate_limit.RATE_LIMITED
+    with rate_limit.admission("huggingface", "other@example.com") as rejected:
+        assert rejected is None
+
+def test_cached_response_expires(monkeypatch):
+    rate_limit.cache_response("openweather", "weather:guntur", {"temp": 31})
+    assert rate_limit.get_cached_response("openweather", "weather:guntur") == {"temp": 31}
+
+    ttl = rate_limit.UPSTREAM_LIMITS["openweather"]["cache_ttl"]
+    now = time.time()
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now + ttl + 1)
+    assert rate_limit.get_cached_response("openweather", "weather:guntur") is None
+
+def test_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RESPONSE_CACHE_MAX_ENTRIES", 3)
+    clock = iter(range(1000))
+    now = time.time()
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now + next(clock))
+
+    for key in ("a", "b", "c"):
+        rate_limit.cache_response("huggingface", key, key)
+    rate_limit.get_cached_response("huggingface", "a")
+    rate_limit.cache_response("huggingface", "d", "d")
+
+    cached = {key: rate_limit.get_cached_response("huggingface", key) for key in "abcd"}
+    assert cached == {"a": "a", "b": None, "c": "c", "d": "d"}
+
+def test_speculative_calls_use_only_spare_capacity():
+    limits = rate_limit.UPSTREAM_LIMITS["huggingface"]
+    spare = limits["max_concurrency"] - limits["reserved_slots"]
+    slots = []
+    for _ in range(spare):
+        slot_id, reason = rate_limit.try_acquire("huggingface", speculative=True)
+        assert reason is None
+        slots.append(slot_id)
+    assert rate_limit.try_acquire("huggingface", speculative=True) == (None, rate_limit.OVERLOADED)
+
+    # Users still get the reserved slots, and speculation didn't touch their buckets
+    for _ in range(limits["reserved_slots"]):
+        slot_id, reason = rate_limit.try_acquire("huggingface", "farmer@example.com")
+        assert reason is None
+        slots.append(slot_id)
+    assert rate_limit.try_acquire("huggingface", "farmer@example.com")[1] == rate_limit.OVERLOADED
+
+    for slot_id in slots:
+        rate_limit.release(slot_id)
+    with rate_limit.admission("huggingface", "farmer@example.com") as rejected:
+        assert rejected is None
@@ -0,0 +1,69 @@
+import time
+
+from utils.sensor_stream import READINGS_TOPIC, LocalBroker, RecommendationStore, SensorPipeline
+
+def _reading(field_id="plot-1", **overrides):
+    reading = {"field_id": field_id, "N": 90, "P": 42, "K": 43, "temperature": 20.8,
+               "humidity": 82, "ph": 6.5, "ts": 1000.0}
+    reading.update(overrides)
+    return reading
+
+def _pipeline(predict=None):
+    return SensorPipeline(predict or (lambda rows: ["Rice"] * len(rows)), RecommendationStore(),
+                          min_readings=1)
+
+def test_non_finite_readings_are_rejected():
+    pipeline = _pipeline()
+    pipeline.ingest([
+        _reading(N="nan"),
+        _reading(humidity=float("inf")),
+        _reading(ts="-inf"),
+        _reading(rainfall="nan"),
+        "not a reading",
+        _reading(),
+    ])
+
+    assert pipeline.stats["readings"] == 1
+    assert pipeline.stats["rejected"] == 5
+    assert pipeline.fields["plot-1"].features()[0] == 90
+
+def test_failed_flush_keeps_fields_dirty():
+    calls = []
+    def predict(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return ["Rice"] * len(rows)
+
+    pipeline = _pipeline(predict)
+    pipeline.ingest([_reading("plot-1"), _reading("plot-2")])
+    try:
+        pipeline.flush()
+    except RuntimeError:
+        pass
+
+    assert pipeline.dirty == {"plot-1", "plot-2"}
+    assert pipeline.flush() == 2
+    assert pipeline.store.get("plot-1")["crop"] == "Rice"
+
+def test_pipeline_thread_survives_errors():
+    calls = []
+    def predict(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return ["Rice"] * len(rows)
+
+    broker = LocalBroker()
+    pipeline = _pipeline(predict)
+    pipeline.start(broker, flush_interval=0.01)
+    broker.publish(READINGS_TOPIC, [_reading(N=float("nan")), _reading()])
+
+    deadline = time.time() + 5
+    while pipeline.store.get("plot-1") is None and time.time() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+
+    assert pipeline.store.get("plot-1")["crop"] == "Rice"
+    assert pipeline.stats["errors"] == 1
+    assert pipeline.stats["rejected"] == 1
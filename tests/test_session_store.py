@@ -0,0 +1,95 @@
+import pytest
+
+from utils.session_store import (
+    MAX_MESSAGE_CHARS,
+    MIN_CHAT_MESSAGES,
+    LRUSessionStore,
+    SessionStore,
+    _size,
+)
+
+PAYLOAD = "x" * 2000
+
+def _fill(store, session_id):
+    store.set(session_id, "recommendation", {"crop": "Rice", "notes": PAYLOAD})
+
+def test_interface_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+def test_chat_history_is_compacted_to_the_session_budget():
+    store = LRUSessionStore(session_budget=8 * 1024)
+    for i in range(40):
+        store.append_chat("s1", "user", f"question {i} " + "y" * 500)
+    store.append_chat("s1", "assistant", "z" * (MAX_MESSAGE_CHARS * 3))
+
+    history = store.get("s1", "chat_history")
+    assert len(history) >= MIN_CHAT_MESSAGES
+    assert history[-1]["role"] == "assistant"
+    assert len(history[-1]["content"]) == MAX_MESSAGE_CHARS + 1
+    assert "question 0 " not in [m["content"][:11] for m in history]
+    assert store.stats()["largest_session_bytes"] <= 8 * 1024
+
+def test_latest_exchange_survives_compaction():
+    store = LRUSessionStore(session_budget=1024)
+    store.append_chat("s1", "user", "q" * 3000)
+    store.append_chat("s1", "assistant", "a" * 3000)
+
+    assert [m["role"] for m in store.get("s1", "chat_history")] == ["user", "assistant"]
+
+def test_least_recently_used_sessions_are_dropped_without_spill():
+    store = LRUSessionStore(memory_budget=5000)
+    _fill(store, "a")
+    _fill(store, "b")
+    store.get("a", "recommendation")
+    _fill(store, "c")
+
+    assert store.get("a", "recommendation")["crop"] == "Rice"
+    assert store.get("b", "recommendation") is None
+    assert store.stats()["sessions_spilled"] == 0
+
+def test_sessions_over_budget_are_spilled_and_loaded_back(tmp_path):
+    store = LRUSessionStore(memory_budget=5000, spill_path=str(tmp_path / "sessions.sqlite3"))
+    _fill(store, "a")
+    _fill(store, "b")
+    _fill(store, "c")
+
+    stats = store.stats()
+    assert stats["sessions_in_memory"] == 2
+    assert stats["sessions_spilled"] == 1
+    assert stats["spilled_bytes"] > len(PAYLOAD)
+
+    # Loading "a" back spills the least recently used of the others
+    assert store.get("a", "recommendation") == {"crop": "Rice", "notes": PAYLOAD}
+    stats = store.stats()
+    assert (stats["sessions_in_memory"], stats["sessions_spilled"]) == (2, 1)
+    assert store.get("b", "recommendation")["crop"] == "Rice"
+
+def test_idle_sessions_are_evicted_from_memory_and_spill(tmp_path):
+    store = LRUSessionStore(memory_budget=5000, idle_timeout=60, spill_path=str(tmp_path / "sessions.sqlite3"))
+    _fill(store, "a")
+    _fill(store, "b")
+    _fill(store, "c")
+    store._spill.execute("UPDATE sessions SET last_access = last_access - 120")
+    store._sessions["b"]["last_access"] -= 120
+
+    assert store.evict_idle() == 2
+    stats = store.stats()
+    assert (stats["sessions_in_memory"], stats["sessions_spilled"]) == (1, 0)
+    assert store.get("c", "recommendation")["crop"] == "Rice"
+
+def test_stats_track_memory_and_delete():
+    store = LRUSessionStore()
+    _fill(store, "a")
+    store.append_chat("b", "user", "hello")
+    stats = store.stats()
+
+    sizes = [_size({"recommendation": {"crop": "Rice", "notes": PAYLOAD}}),
+             _size({"chat_history": [{"role": "user", "content": "hello"}]})]
+    assert stats["sessions_in_memory"] == 2
+    assert stats["memory_bytes"] == sum(sizes)
+    assert stats["largest_session_bytes"] == max(sizes)
+
+    store.delete("a")
+    store.delete("b")
+    assert store.stats()["memory_bytes"] == 0
@@ -0,0 +1,29 @@
+import pickle
+
+import pytest
+
+from train_model import choose_model
+from utils.crops import crop_dict, label_map
+
+def _result(family, accuracy, p99_ms):
+    return {"family": family, "accuracy": accuracy, "p99_ms": p99_ms, "size_kb": 1.0}
+
+def test_crop_mapping_matches_shipped_model():
+    with open("model.pkl", "rb") as f:
+        model = pickle.load(f)
+    assert sorted(crop_dict) == list(model.classes_)
+    assert crop_dict[11] == "Mango" and crop_dict[21] == "Coffee"
+    assert label_map["coffee"] == 21
+
+def test_choose_model_only_considers_forests_by_default():
+    results = {
+        "Naive Bayes": _result("other", 0.995, 0.05),
+        "Random Forest (trees=10, depth=full)": _result("forest", 0.990, 1.0),
+        "Random Forest (trees=100, depth=full)": _result("forest", 0.993, 5.0),
+    }
+    assert choose_model(results, 0.005) == "Random Forest (trees=10, depth=full)"
+    assert choose_model(results, 0.005, any_family=True) == "Naive Bayes"
+
+def test_choose_model_without_forests_fails():
+    with pytest.raises(ValueError):
+        choose_model({"Naive Bayes": _result("other", 0.99, 0.05)}, 0.005)
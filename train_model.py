@@ -0,0 +1,208 @@
+"""Reproducible training pipeline for the crop recommendation model.
+
+Rebuilds minmaxscaler.pkl, standscaler.pkl and model.pkl from
+Crop_recommendation.csv, plus training_stats.json (the raw training
+feature means and stds used by utils/drift.py). It sweeps random forest size/depth and the
+alternative models from the notebook, reports accuracy against single-row
+latency, batch throughput and artifact size, and saves the chosen model in
+the format app.py and app_enhanced.py load.
+
+Usage:
+    python train_model.py --data Crop_recommendation.csv --n-jobs 4
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import (
+    AdaBoostClassifier,
+    BaggingClassifier,
+    GradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier, ExtraTreeClassifier
+
+from utils.crops import FEATURE_NAMES, label_map
+from utils.drift import save_training_stats
+from utils.explain import explain_predictions, supports_attribution
+
+RANDOM_STATE = 42
+
+def load_dataset(path):
+    crop = pd.read_csv(path)
+    unknown = sorted(set(crop["label"]) - set(label_map))
+    if unknown:
+        raise ValueError(f"Unknown crop labels in dataset: {', '.join(unknown)}")
+
+    X = crop[FEATURE_NAMES].to_numpy(dtype=float)
+    y = crop["label"].map(label_map).to_numpy()
+    return X, y
+
+def candidate_models(seed=RANDOM_STATE):
+    candidates = {}
+    for n_estimators in (10, 25, 50, 100, 200):
+        for max_depth in (None, 8, 12, 16):
+            name = f"Random Forest (trees={n_estimators}, depth={max_depth or 'full'})"
+            candidates[name] = RandomForestClassifier(
+                n_estimators=n_estimators, max_depth=max_depth, random_state=seed
+            )
+
+    candidates.update({
+        "Logistic Regression": LogisticRegression(max_iter=1000),
+        "Naive Bayes": GaussianNB(),
+        "Support Vector Machine": SVC(),
+        "K-Nearest Neighbors": KNeighborsClassifier(),
+        "Decision Tree": DecisionTreeClassifier(random_state=seed),
+        "Extra Tree": ExtraTreeClassifier(random_state=seed),
+        "Bagging": BaggingClassifier(random_state=seed),
+        "AdaBoost": AdaBoostClassifier(random_state=seed),
+        "Gradient Boosting": GradientBoostingClassifier(random_state=seed),
+    })
+    return candidates
+
+def _fit(name, model, X_train, y_train):
+    model.fit(X_train, y_train)
+    return name, model
+
+def measure(model, X_test, y_test, latency_samples=300, batch_rows=10000):
+    """Accuracy, single-row latency percentiles, batch throughput and pickled size."""
+    # The app predicts one row at a time in the request thread
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+
+    rows = X_test[np.arange(latency_samples) % len(X_test)]
+    model.predict(rows[:1])  # warm up
+    latencies = []
+    for i in range(latency_samples):
+        row = rows[i:i + 1]
+        start = time.perf_counter()
+        model.predict(row)
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+
+    # Cost of the "why this crop" attribution path, which the app runs per prediction
+    explain_p50_ms = None
+    if supports_attribution(model):
+        explain_predictions(model, rows[:1])
+        explain_latencies = []
+        for i in range(latency_samples):
+            start = time.perf_counter()
+            explain_predictions(model, rows[i:i + 1])
+            explain_latencies.append(time.perf_counter() - start)
+        explain_p50_ms = float(np.percentile(np.array(explain_latencies) * 1000, 50))
+
+    batch = X_test[np.arange(batch_rows) % len(X_test)]
+    start = time.perf_counter()
+    model.predict(batch)
+    throughput = batch_rows / (time.perf_counter() - start)
+
+    return {
+        "family": "forest" if isinstance(model, RandomForestClassifier) else "other",
+        "accuracy": float(accuracy),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "explain_p50_ms": explain_p50_ms,
+        "rows_per_sec": float(throughput),
+        "size_kb": len(pickle.dumps(model)) / 1024,
+    }
+
+def choose_model(results, max_accuracy_drop, max_p99_ms=None, any_family=False):
+    """Fastest model within ``max_accuracy_drop`` of the best accuracy.
+
+    Only random forests are eligible unless ``any_family`` is set: the
+    "why this crop" attribution and compact_model.py both need one.
+    """
+    candidates = {
+        name: r for name, r in results.items()
+        if any_family or r["family"] == "forest"
+    }
+    if not candidates:
+        raise ValueError("No random forest among the candidates")
+    best_accuracy = max(r["accuracy"] for r in candidates.values())
+    eligible = {
+        name: r for name, r in candidates.items()
+        if r["accuracy"] >= best_accuracy - max_accuracy_drop
+        and (max_p99_ms is None or r["p99_ms"] <= max_p99_ms)
+    }
+    if not eligible:
+        raise ValueError("No model satisfies the accuracy and latency constraints")
+    return min(eligible, key=lambda name: (eligible[name]["p99_ms"], eligible[name]["size_kb"]))
+
+def print_report(results, chosen):
+    header = (f"{'Model':<45} {'Accuracy':>8} {'p50 ms':>8} {'p99 ms':>8} {'explain':>8} "
+              f"{'rows/s':>10} {'Size KB':>9}")
+    print(header)
+    print("-" * len(header))
+    for name, r in sorted(results.items(), key=lambda item: -item[1]["accuracy"]):
+        marker = " *" if name == chosen else ""
+        explain = f"{r['explain_p50_ms']:.3f}" if r["explain_p50_ms"] is not None else "-"
+        print(f"{name:<45} {r['accuracy']:>8.4f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {explain:>8} "
+              f"{r['rows_per_sec']:>10.0f} {r['size_kb']:>9.1f}{marker}")
+    print(f"\nChosen model: {chosen}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and select the crop recommendation model")
+    parser.add_argument("--data", default="Crop_recommendation.csv", help="training dataset CSV")
+    parser.add_argument("--output-dir", default=".", help="where to write the .pkl artifacts")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel jobs for fitting")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.005,
+                        help="accept models this far below the best accuracy")
+    parser.add_argument("--max-p99-ms", type=float, default=None,
+                        help="reject models slower than this single-row p99 latency")
+    parser.add_argument("--any-family", action="store_true",
+                        help="also consider non-forest models (disables attribution and compact_model.py)")
+    parser.add_argument("--report", help="also write the sweep results to this JSON file")
+    args = parser.parse_args()
+
+    X, y = load_dataset(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=RANDOM_STATE
+    )
+
+    # Same preprocessing chain the app applies: MinMax, then Standard
+    ms = MinMaxScaler()
+    sc = StandardScaler()
+    X_train_raw = X_train
+    X_train = sc.fit_transform(ms.fit_transform(X_train))
+    X_test = sc.transform(ms.transform(X_test))
+
+    candidates = candidate_models()
+    print(f"Fitting {len(candidates)} candidate models with n_jobs={args.n_jobs}...")
+    fitted = dict(Parallel(n_jobs=args.n_jobs)(
+        delayed(_fit)(name, model, X_train, y_train) for name, model in candidates.items()
+    ))
+
+    # Timings are taken sequentially so the candidates don't compete for CPU
+    results = {name: measure(model, X_test, y_test) for name, model in fitted.items()}
+    chosen = choose_model(results, args.max_accuracy_drop, args.max_p99_ms, args.any_family)
+    print_report(results, chosen)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    artifacts = {"model.pkl": fitted[chosen], "standscaler.pkl": sc, "minmaxscaler.pkl": ms}
+    for filename, obj in artifacts.items():
+        with open(os.path.join(args.output_dir, filename), "wb") as f:
+            pickle.dump(obj, f)
+    save_training_stats(X_train_raw, os.path.join(args.output_dir, "training_stats.json"),
+                        source=f"{os.path.basename(args.data)} training split")
+    print(f"Saved {', '.join(artifacts)} and training_stats.json to {args.output_dir}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"chosen": chosen, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Compact binary random forest format with a NumPy-only evaluator.
+
+Written by compact_model.py. The scalers are folded into the split
+thresholds, so predict() takes raw feature values
+(N, P, K, temperature, humidity, ph, rainfall) and needs neither
+scikit-learn nor the scaler pickles.
+
+File layout (little endian):
+    header      magic b"CRPF", version u16, n_features u16, n_classes u16, n_trees u16
+    classes     int32[n_classes]
+    threshold   float32[n_nodes]
+    right       uint16[n_nodes]   right child within the tree, or class index for leaves
+    tree_sizes  uint16[n_trees]
+    feature     int8[n_nodes]     split feature, -1 for leaves
+
+Nodes of every tree are stored in preorder, so a split's left child is
+always the next node.
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"CRPF"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHHH")
+MAX_TREE_NODES = np.iinfo(np.uint16).max
+
+class CompactForest:
+    def __init__(self, classes, tree_sizes, feature, threshold, right, n_features):
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = n_features
+        self.n_trees = len(tree_sizes)
+
+        tree_sizes = np.asarray(tree_sizes, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(tree_sizes)[:-1]))
+        node_offsets = np.repeat(offsets, tree_sizes)
+        idx = np.arange(len(feature), dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+
+        self.roots = offsets.astype(np.int32)
+        self.is_leaf = np.asarray(feature) < 0
+        # Leaves point back at themselves so traversal can run in lockstep
+        self.left = np.where(self.is_leaf, idx, idx + 1).astype(np.int32)
+        self.right = np.where(self.is_leaf, idx, right + node_offsets).astype(np.int32)
+        self.leaf_class = np.where(self.is_leaf, right, 0).astype(np.int32)
+        self.feature = np.where(self.is_leaf, 0, feature).astype(np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+
+        # Raw arrays, kept for re-serialising a subset of trees
+        self._tree_sizes = tree_sizes
+        self._raw_feature = np.asarray(feature, dtype=np.int8)
+        self._raw_right = right.astype(np.uint16)
+
+    @property
+    def n_nodes(self):
+        return len(self.threshold)
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+
+        while True:
+            active = ~self.is_leaf[nodes]
+            if not active.any():
+                return nodes
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+    def tree_votes(self, X):
+        """Class index voted by every tree, shape (n_rows, n_trees)."""
+        return self.leaf_class[self.apply(X)]
+
+    def predict_proba(self, X):
+        votes = self.tree_votes(X)
+        n_classes = len(self.classes_)
+        flat = (np.arange(len(votes))[:, None] * n_classes + votes).ravel()
+        counts = np.bincount(flat, minlength=len(votes) * n_classes)
+        return counts.reshape(len(votes), n_classes) / self.n_trees
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def subset(self, tree_indices):
+        """Return a new forest made of the given trees."""
+        starts = np.concatenate(([0], np.cumsum(self._tree_sizes)))
+        pick = np.concatenate([np.arange(starts[t], starts[t + 1]) for t in tree_indices])
+        return CompactForest(
+            self.classes_,
+            self._tree_sizes[list(tree_indices)],
+            self._raw_feature[pick],
+            self.threshold[pick],
+            self._raw_right[pick],
+            self.n_features_in_,
+        )
+
+    def to_bytes(self):
+        header = _HEADER.pack(MAGIC, VERSION, self.n_features_in_, len(self.classes_), self.n_trees)
+        return b"".join([
+            header,
+            self.classes_.astype("<i4").tobytes(),
+            self.threshold.astype("<f4").tobytes(),
+            self._raw_right.astype("<u2").tobytes(),
+            self._tree_sizes.astype("<u2").tobytes(),
+            self._raw_feature.astype("i1").tobytes(),
+        ])
+
+def from_bytes(data):
+    magic, version, n_features, n_classes, n_trees = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a compact forest file")
+
+    offset = _HEADER.size
+    classes = np.frombuffer(data, dtype="<i4", count=n_classes, offset=offset)
+    offset += classes.nbytes
+    # Every node takes 7 bytes (float32 + uint16 + int8), tree sizes 2 bytes each
+    n_nodes = (len(data) - offset - 2 * n_trees) // 7
+    threshold = np.frombuffer(data, dtype="<f4", count=n_nodes, offset=offset)
+    offset += threshold.nbytes
+    right = np.frombuffer(data, dtype="<u2", count=n_nodes, offset=offset)
+    offset += right.nbytes
+    tree_sizes = np.frombuffer(data, dtype="<u2", count=n_trees, offset=offset)
+    offset += tree_sizes.nbytes
+    feature = np.frombuffer(data, dtype="i1", count=n_nodes, offset=offset)
+
+    if int(tree_sizes.sum()) != n_nodes:
+        raise ValueError("Corrupt compact forest file")
+    return CompactForest(classes, tree_sizes, feature, threshold, right, n_features)
+
+def save_compact_forest(forest, path):
+    with open(path, "wb") as f:
+        f.write(forest.to_bytes())
+
+def load_compact_forest(path):
+    with open(path, "rb") as f:
+        return from_bytes(f.read())
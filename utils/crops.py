@@ -0,0 +1,13 @@
+# Label numbering used to train model.pkl (see the notebook); the dataset has no Grapes
+crop_dict = {
+    1: "Rice", 2: "Maize", 3: "Jute", 4: "Cotton", 5: "Coconut", 6: "Papaya", 7: "Orange",
+    8: "Apple", 9: "Muskmelon", 10: "Watermelon", 11: "Mango", 12: "Banana",
+    13: "Pomegranate", 14: "Lentil", 15: "Blackgram", 16: "Mungbean", 17: "Mothbeans",
+    18: "Pigeonpeas", 19: "Kidneybeans", 20: "Chickpea", 21: "Coffee"
+}
+
+# Dataset "label" column value -> class number
+label_map = {name.lower(): num for num, name in crop_dict.items()}
+
+# Column order expected by the scalers and the model
+FEATURE_NAMES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
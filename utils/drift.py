@@ -0,0 +1,302 @@
+"""Input drift and out-of-range monitoring for the prediction path.
+
+Every prediction is recorded into constant-memory sketches: a fixed-bin
+histogram per feature over the training range (with below/above bins for
+out-of-range inputs), running sums for mean and spread, and predicted-class
+counts. The reference range is MinMaxScaler's data_min_/data_max_; the
+reference mean and std come from training_stats.json (written by
+train_model.py), or from StandardScaler's mean_/var_ mapped back to raw
+units when that file is missing. Counts are halved every DRIFT_DECAY_EVERY records so the sketches
+follow recent traffic. A single row is recorded in plain Python and a
+batch with a few vectorised NumPy ops, a few microseconds either way.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from utils.crops import FEATURE_NAMES, crop_dict
+
+DRIFT_BINS = 16
+DRIFT_DECAY_EVERY = int(os.getenv("DRIFT_DECAY_EVERY", 5000))
+# No alerts until this many predictions have been recorded
+DRIFT_MIN_RECORDS = int(os.getenv("DRIFT_MIN_RECORDS", 50))
+
+# Alert thresholds; a feature's drift score is its worst measure relative to these
+OUT_OF_RANGE_ALERT = 0.05  # fraction of inputs outside the training range
+MEAN_SHIFT_ALERT = 1.0  # shift of the mean, in training standard deviations
+CLASS_DRIFT_ALERT = 0.5  # total variation distance from the training class mix
+
+# Per-feature mean and std of the training data, in raw units
+TRAINING_STATS_PATH = os.getenv("TRAINING_STATS_PATH", "training_stats.json")
+
+def save_training_stats(X, path, source):
+    """Write the per-feature mean and std of raw training rows ``X`` to ``path``."""
+    X = np.asarray(X, dtype=float)
+    with open(path, "w") as f:
+        json.dump({
+            "source": source,
+            "rows": len(X),
+            "features": FEATURE_NAMES,
+            "mean": X.mean(axis=0).tolist(),
+            "std": X.std(axis=0, ddof=1).tolist(),
+        }, f, indent=2)
+
+def load_training_stats(path=TRAINING_STATS_PATH):
+    """Training stats written by save_training_stats(), or None when unavailable."""
+    try:
+        with open(path) as f:
+            stats = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error loading training stats from {path}: {e}")
+        return None
+    if stats.get("features") != FEATURE_NAMES:
+        print(f"Ignoring training stats in {path}: features don't match {FEATURE_NAMES}")
+        return None
+    return stats
+
+def training_reference(sc, ms, stats=None):
+    """Per-feature min, max, mean and std of the training data, in raw units.
+
+    The mean and std are taken from ``stats`` (see load_training_stats) when
+    given. Otherwise they come from the StandardScaler: MinMaxScaler maps x
+    to x * scale_ + min_, and StandardScaler was fitted on that output, so
+    its mean_/var_ are mapped back through the same affine.
+
+    A StandardScaler fitted on fewer than two rows (as the shipped
+    standscaler.pkl was) has zero variance and says nothing about the data.
+    Without stats such features fall back to the middle of the MinMax range
+    and half its width, which never overstates a shift but also can't flag
+    one that stays within the range.
+    """
+    lo = np.asarray(ms.data_min_, dtype=float)
+    hi = np.asarray(ms.data_max_, dtype=float)
+    if stats is not None:
+        return {"min": lo, "max": hi,
+                "mean": np.asarray(stats["mean"], dtype=float), "std": np.asarray(stats["std"], dtype=float)}
+
+    var = np.asarray(sc.var_, dtype=float)
+    unfitted = (var <= 0) | (np.asarray(sc.n_samples_seen_) < 2)
+    return {
+        "min": lo,
+        "max": hi,
+        "mean": np.where(unfitted, (lo + hi) / 2, (sc.mean_ - ms.min_) / ms.scale_),
+        "std": np.where(unfitted, (hi - lo) / 2, np.sqrt(var) / ms.scale_),
+    }
+
+def class_reference(model):
+    """Training class frequencies: root-node priors for tree models, else uniform."""
+    classes = np.asarray(model.classes_)
+    estimators = getattr(model, "estimators_", [model])
+    trees = [getattr(est, "tree_", None) for est in estimators]
+    if trees and all(t is not None and t.value.shape[2] == len(classes) for t in trees):
+        priors = np.mean([t.value[0, 0] / t.value[0, 0].sum() for t in trees], axis=0)
+    else:
+        priors = np.full(len(classes), 1.0 / len(classes))
+    return classes, priors
+
+class DriftMonitor:
+    def __init__(self, reference, classes, class_priors, bins=DRIFT_BINS, decay_every=DRIFT_DECAY_EVERY):
+        self.reference = reference
+        self.bins = bins
+        self.decay_every = decay_every
+        self.n_features = len(reference["min"])
+        self.classes = np.asarray(classes)
+        self.class_priors = np.asarray(class_priors, dtype=float)
+
+        width = (reference["max"] - reference["min"]) / bins
+        self._lo = reference["min"]
+        self._hi = reference["max"]
+        self._inv_width = np.divide(1.0, width, out=np.zeros_like(width), where=width > 0)
+        # Bin 0 is below the training range, bins 1..bins inside it, bins + 1 above
+        self._offsets = np.arange(self.n_features) * (bins + 2)
+        # Plain lists for the single-row path, which is cheaper in pure Python
+        # than paying NumPy's per-call overhead on seven values
+        self._row_params = list(zip(
+            self._offsets.tolist(), self._lo.tolist(), self._hi.tolist(), self._inv_width.tolist()
+        ))
+        self._class_index = {label: i for i, label in enumerate(self.classes.tolist())}
+
+        self._lock = threading.Lock()
+        self.total_records = 0
+        self._since_decay = 0
+        self._weight = 0.0
+        self._counts = [0.0] * (self.n_features * (bins + 2))
+        self._sums = [0.0] * self.n_features
+        self._sumsq = [0.0] * self.n_features
+        self._seen_min = [float("inf")] * self.n_features
+        self._seen_max = [float("-inf")] * self.n_features
+        self._class_counts = [0.0] * len(self.classes)
+
+    def record(self, X, predictions=None):
+        """Add raw (unscaled) input rows and, optionally, their predicted labels."""
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 2 and len(X) > 1:
+            self._record_batch(X, predictions)
+            return
+        row = X.ravel().tolist()
+        label = None
+        if predictions is not None:
+            label = predictions[0] if len(predictions) else None
+            label = label.item() if isinstance(label, np.generic) else label
+        last_bin = self.bins - 1
+
+        with self._lock:
+            counts, sums, sumsq = self._counts, self._sums, self._sumsq
+            seen_min, seen_max = self._seen_min, self._seen_max
+            for f, (x, (offset, lo, hi, inv_width)) in enumerate(zip(row, self._row_params)):
+                if x < lo:
+                    counts[offset] += 1
+                elif x > hi:
+                    counts[offset + last_bin + 2] += 1
+                else:
+                    counts[offset + 1 + min(int((x - lo) * inv_width), last_bin)] += 1
+                sums[f] += x
+                sumsq[f] += x * x
+                if x < seen_min[f]:
+                    seen_min[f] = x
+                if x > seen_max[f]:
+                    seen_max[f] = x
+            index = self._class_index.get(label)
+            if index is not None:
+                self._class_counts[index] += 1
+            self._added(1)
+
+    def _record_batch(self, X, predictions):
+        bins = np.floor((X - self._lo) * self._inv_width).astype(np.intp)
+        np.clip(bins, -1, self.bins - 1, out=bins)
+        bins += 1
+        bins[X > self._hi] = self.bins + 1
+        hist = np.bincount((bins + self._offsets).ravel(), minlength=len(self._counts)).tolist()
+        sums = X.sum(axis=0).tolist()
+        sumsq = np.einsum("ij,ij->j", X, X).tolist()
+        mins, maxs = X.min(axis=0).tolist(), X.max(axis=0).tolist()
+
+        class_hist = None
+        if predictions is not None:
+            order = np.argsort(self.classes)
+            sorted_classes = self.classes[order]
+            labels = np.asarray(predictions).ravel()
+            pos = np.searchsorted(sorted_classes, labels)
+            np.minimum(pos, len(sorted_classes) - 1, out=pos)
+            known = sorted_classes[pos] == labels
+            class_hist = np.bincount(order[pos[known]], minlength=len(self.classes)).tolist()
+
+        with self._lock:
+            self._counts = [a + b for a, b in zip(self._counts, hist)]
+            self._sums = [a + b for a, b in zip(self._sums, sums)]
+            self._sumsq = [a + b for a, b in zip(self._sumsq, sumsq)]
+            self._seen_min = [min(a, b) for a, b in zip(self._seen_min, mins)]
+            self._seen_max = [max(a, b) for a, b in zip(self._seen_max, maxs)]
+            if class_hist is not None:
+                self._class_counts = [a + b for a, b in zip(self._class_counts, class_hist)]
+            self._added(len(X))
+
+    def _added(self, n):
+        self._weight += n
+        self.total_records += n
+        self._since_decay += n
+        if self._since_decay >= self.decay_every:
+            self._counts = [c * 0.5 for c in self._counts]
+            self._sums = [s * 0.5 for s in self._sums]
+            self._sumsq = [s * 0.5 for s in self._sumsq]
+            self._class_counts = [c * 0.5 for c in self._class_counts]
+            self._weight *= 0.5
+            self._since_decay = 0
+
+    def _quantile(self, hist, q, feature, seen_min, seen_max):
+        """Approximate quantile from one feature's histogram, interpolating within the bin."""
+        lo, hi = self._lo[feature], self._hi[feature]
+        edges = np.concatenate((
+            [min(seen_min, lo)],
+            np.linspace(lo, hi, self.bins + 1),
+            [max(seen_max, hi)],
+        ))
+        target = q * hist.sum()
+        cumulative = 0.0
+        for i, count in enumerate(hist):
+            if count > 0 and cumulative + count >= target:
+                return float(edges[i] + (edges[i + 1] - edges[i]) * (target - cumulative) / count)
+            cumulative += count
+        return float(edges[-1])
+
+    def report(self):
+        """Drift scores per feature and for the predicted classes, plus alert messages."""
+        with self._lock:
+            weight = self._weight
+            counts = np.array(self._counts).reshape(self.n_features, self.bins + 2)
+            sums, sumsq = np.array(self._sums), np.array(self._sumsq)
+            seen_min, seen_max = list(self._seen_min), list(self._seen_max)
+            class_counts = np.array(self._class_counts)
+            total = self.total_records
+
+        ref = self.reference
+        report = {"records": total, "features": {}, "classes": {}, "class_drift": 0.0, "alerts": []}
+        if weight == 0:
+            return report
+
+        mean = sums / weight
+        std = np.sqrt(np.maximum(sumsq / weight - mean ** 2, 0.0))
+        ref_std = np.where(ref["std"] > 0, ref["std"], 1.0)
+        ready = total >= DRIFT_MIN_RECORDS
+
+        for f, name in enumerate(FEATURE_NAMES[:self.n_features]):
+            below = counts[f, 0] / weight
+            above = counts[f, -1] / weight
+            shift = (mean[f] - ref["mean"][f]) / ref_std[f]
+            score = max((below + above) / OUT_OF_RANGE_ALERT, abs(shift) / MEAN_SHIFT_ALERT)
+            report["features"][name] = {
+                "score": float(score),
+                "out_of_range": float(below + above),
+                "below_range": float(below),
+                "above_range": float(above),
+                "mean": float(mean[f]),
+                "mean_shift": float(shift),
+                "std_ratio": float(std[f] / ref_std[f]),
+                "p05": self._quantile(counts[f], 0.05, f, seen_min[f], seen_max[f]),
+                "p50": self._quantile(counts[f], 0.50, f, seen_min[f], seen_max[f]),
+                "p95": self._quantile(counts[f], 0.95, f, seen_min[f], seen_max[f]),
+                "train_min": float(ref["min"][f]),
+                "train_max": float(ref["max"][f]),
+            }
+            if not ready:
+                continue
+            if below + above > OUT_OF_RANGE_ALERT:
+                report["alerts"].append(
+                    f"{name}: {below + above:.0%} of inputs outside the training range "
+                    f"[{ref['min'][f]:g}, {ref['max'][f]:g}]"
+                )
+            if abs(shift) > MEAN_SHIFT_ALERT:
+                report["alerts"].append(
+                    f"{name}: mean {mean[f]:.1f} is {shift:+.1f} std from training mean {ref['mean'][f]:.1f}"
+                )
+
+        class_total = class_counts.sum()
+        if class_total > 0:
+            freq = class_counts / class_total
+            drift = 0.5 * float(np.abs(freq - self.class_priors).sum())
+            report["class_drift"] = drift
+            report["classes"] = {
+                crop_dict.get(label, str(label)): float(p)
+                for label, p in zip(self.classes.tolist(), freq) if p > 0
+            }
+            if ready and drift > CLASS_DRIFT_ALERT:
+                report["alerts"].append(
+                    f"predicted crops: mix differs from training by {drift:.0%} (total variation)"
+                )
+        return report
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_drift_monitor(sc, ms, model):
+    """Process-wide monitor, with its reference taken from the first scalers and model seen."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            classes, priors = class_reference(model)
+            _monitor = DriftMonitor(training_reference(sc, ms, load_training_stats()), classes, priors)
+        return _monitor
@@ -0,0 +1,78 @@
+"""Per-feature attribution for tree model predictions.
+
+Uses path decomposition (Saabas): walking a row down a tree, every split
+changes the node's class probabilities, and that change is credited to
+the split's feature. Summed over the path this is exactly
+leaf value - root value, so for a forest
+
+    predict_proba(x) == bias + contributions(x).sum(over features)
+
+The per-node changes are precomputed once per model as a sparse
+(nodes x features*classes) matrix, so explaining any number of rows is one
+decision_path() traversal plus one sparse matrix product.
+"""
+import threading
+
+import numpy as np
+from scipy import sparse
+
+_lock = threading.Lock()
+_deltas = {}
+
+def supports_attribution(model):
+    return hasattr(model, "decision_path") and (hasattr(model, "estimators_") or hasattr(model, "tree_"))
+
+def _trees(model):
+    return [est.tree_ for est in model.estimators_] if hasattr(model, "estimators_") else [model.tree_]
+
+def _build_deltas(model):
+    n_features = model.n_features_in_
+    n_classes = len(model.classes_)
+    trees = _trees(model)
+    blocks = []
+    bias = np.zeros(n_classes)
+
+    for tree in trees:
+        values = tree.value[:, 0, :]
+        values = values / values.sum(axis=1, keepdims=True)
+        internal = np.flatnonzero(tree.children_left != -1)
+        parent = np.full(tree.node_count, -1)
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+
+        children = np.flatnonzero(parent >= 0)
+        parents = parent[children]
+        delta = values[children] - values[parents]
+        cols = tree.feature[parents][:, None] * n_classes + np.arange(n_classes)
+        blocks.append(sparse.csr_matrix(
+            (delta.ravel(), (np.repeat(children, n_classes), cols.ravel())),
+            shape=(tree.node_count, n_features * n_classes),
+        ))
+        bias += values[0]
+
+    return sparse.vstack(blocks).tocsr() / len(trees), bias / len(trees)
+
+def _get_deltas(model):
+    key = id(model)
+    with _lock:
+        cached = _deltas.get(key)
+        if cached is None or cached[0] is not model:
+            cached = (model, *_build_deltas(model))
+            _deltas[key] = cached
+    return cached[1], cached[2]
+
+def explain_predictions(model, X):
+    """Class probabilities and per-feature contributions for already scaled rows.
+
+    Returns (proba, contributions, bias) with shapes (n_rows, n_classes),
+    (n_rows, n_features, n_classes) and (n_classes,).
+    """
+    deltas, bias = _get_deltas(model)
+    X = np.atleast_2d(X)
+    paths = model.decision_path(X)
+    if isinstance(paths, tuple):
+        paths = paths[0]
+
+    contributions = (paths @ deltas).toarray().reshape(len(X), model.n_features_in_, len(model.classes_))
+    proba = bias + contributions.sum(axis=1)
+    return proba, contributions, bias
@@ -1,8 +1,13 @@
 import streamlit as st
 import requests
 import os
+import uuid
+from utils.session_store import get_session_store
 
 FIREBASE_API_KEY = st.secrets["FIREBASE_APIKEY"] or os.getenv("FIREBASE_APIKEY")
+FIREBASE_AUTH_URL = os.getenv("FIREBASE_AUTH_URL", "https://identitytoolkit.googleapis.com/v1")
+# Comma-separated emails that see process-wide diagnostics (prefetch, input drift)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 # 2. Session Management
 def init_session_state():
@@ -10,23 +15,37 @@ def init_session_state():
         st.session_state.user = None
     if 'user_email' not in st.session_state:
         st.session_state.user_email = None
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
 def is_logged_in():
     return st.session_state.user is not None
 
+def is_admin():
+    return is_logged_in() and (st.session_state.user_email or "").lower() in ADMIN_EMAILS
+
 def logout_user():
+    # Drops the recommendation and chat history with the rest of the session's
+    # data; the next login starts a fresh session
+    get_session_store().delete(st.session_state.session_id)
+    st.session_state.session_id = uuid.uuid4().hex
     st.session_state.user = None
     st.session_state.user_email = None
+    st.session_state.pop('other_crop', None)
     st.rerun()
 
 # 3. Native Authentication Functions (No Pyrebase required)
+def _session_user(user_data):
+    """Keep only what the app uses from the Firebase REST response (drops the tokens)."""
+    return {"localId": user_data.get("localId"), "email": user_data.get("email")}
+
 def _firebase_auth_request(endpoint, email, password):
     """Internal helper to send requests to Firebase REST API"""
     if not FIREBASE_API_KEY:
         # Fallback for Demo Mode if secrets are missing
         return {"localId": "demo_user", "email": email, "idToken": "demo_token"}
 
-    url = f"https://identitytoolkit.googleapis.com/v1/accounts:{endpoint}?key={FIREBASE_API_KEY}"
+    url = f"{FIREBASE_AUTH_URL}/accounts:{endpoint}?key={FIREBASE_API_KEY}"
     payload = {
         "email": email,
         "password": password,
@@ -55,7 +74,7 @@ def login_user(email, password):
         user_data = _firebase_auth_request("signInWithPassword", email, password)
         
         # Success
-        st.session_state.user = user_data
+        st.session_state.user = _session_user(user_data)
         st.session_state.user_email = email
         return True, "✅ Login successful!"
         
@@ -81,7 +100,7 @@ def signup_user(email, password):
         user_data = _firebase_auth_request("signUp", email, password)
         
         # Success
-        st.session_state.user = user_data
+        st.session_state.user = _session_user(user_data)
         st.session_state.user_email = email
         return True, "✅ Account created successfully!"
         
@@ -1,5 +1,10 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import time
+from collections import Counter, deque
 from datetime import datetime
 import re
 import streamlit as st
@@ -34,6 +39,30 @@ except ImportError as e:
     FIRESTORE_ERROR = f"firebase-admin package not available: {e}"
     print(f"firebase-admin not available: {e}")
 
+# Write-behind: posts and replies are shown from a local overlay immediately
+# and flushed to Firestore in batches by a background writer.
+FEED_CACHE_TTL = 60
+FLUSH_INTERVAL = 0.5
+MAX_BATCH_WRITES = 200
+MAX_WRITE_ATTEMPTS = 5
+# How long process exit waits for queued writes to be flushed
+EXIT_FLUSH_TIMEOUT = 10
+# How long posts and replies that failed to write stay visible as "not delivered"
+FAILED_ITEM_TTL = 3600
+
+# Firestore errors that retrying won't fix
+PERMANENT_WRITE_ERRORS = {"NotFound", "InvalidArgument", "PermissionDenied", "FailedPrecondition"}
+
+_write_queue = queue.Queue()
+_writer_thread = None
+_stopping = threading.Event()
+_lock = threading.Lock()
+_local_posts = {}
+_local_replies = {}
+_feed_cache = {}
+# Most recent permanently failed writes, for get_failed_writes()
+_failed_writes = deque(maxlen=1000)
+
 def is_firestore_configured():
     return db is not None
 
@@ -62,24 +91,229 @@ def add_forum_post(name, topic, message):
         return False, "Input too short"
     
     try:
+        now = datetime.now()
+        # Allocating the id client-side lets replies to this post be queued
+        # before it has been written
+        post_id = db.collection('forum_posts').document().id
         post_data = {
             "name": name,
             "topic": topic,
             "message": message,
             "timestamp": firestore.SERVER_TIMESTAMP,
-            "created_at": datetime.now().isoformat(),
+            "created_at": now.isoformat(),
             "reply_count": 0
         }
-        db.collection('forum_posts').add(post_data)
+        with _lock:
+            _local_posts[post_id] = {
+                "id": post_id,
+                "name": name,
+                "topic": topic,
+                "message": message,
+                "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "created_at": now.isoformat(),
+                "reply_count": 0,
+                "replies": [],
+                "pending": True,
+                "flushed_at": None
+            }
+        _enqueue_write({"kind": "post", "post_id": post_id, "data": post_data})
         return True, "Post added successfully"
     except Exception as e:
         print(f"Error adding post to Firestore: {e}")
         return False, f"Error: {e}"
 
+def _enqueue_write(op):
+    global _writer_thread
+    _write_queue.put(op)
+    with _lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="forum-writer", daemon=True)
+            _writer_thread.start()
+
+def _writer_loop():
+    while True:
+        op = _write_queue.get()
+        ops = [op] if op is not None else []
+        # Give other writes arriving around the same time a chance to share the batch
+        _stopping.wait(FLUSH_INTERVAL)
+        while len(ops) < MAX_BATCH_WRITES:
+            try:
+                op = _write_queue.get_nowait()
+            except queue.Empty:
+                break
+            if op is not None:
+                ops.append(op)
+        if ops:
+            _flush(ops)
+        if _stopping.is_set() and _write_queue.empty():
+            return
+
+@atexit.register
+def _flush_at_exit():
+    """Flush queued writes before the process exits (the writer is a daemon thread)."""
+    thread = _writer_thread
+    if thread is None or not thread.is_alive():
+        return
+    _stopping.set()
+    _write_queue.put(None)
+    thread.join(EXIT_FLUSH_TIMEOUT)
+    if not _write_queue.empty():
+        print(f"Forum writes still queued at exit: {_write_queue.qsize()}")
+
+def _add_to_batch(batch, op):
+    post_ref = db.collection('forum_posts').document(op["post_id"])
+    if op["kind"] == "post":
+        batch.set(post_ref, op["data"])
+    else:
+        batch.set(post_ref.collection('replies').document(op["reply_id"]), op["data"])
+
+def _commit(ops):
+    batch = db.batch()
+    increments = Counter()
+    for op in ops:
+        _add_to_batch(batch, op)
+        if op["kind"] == "reply":
+            increments[op["post_id"]] += 1
+    # One reply_count update per post, however many replies it got
+    for post_id, count in increments.items():
+        batch.update(db.collection('forum_posts').document(post_id), {
+            "reply_count": firestore.Increment(count)
+        })
+    batch.commit()
+
+def _is_permanent(error):
+    return type(error).__name__ in PERMANENT_WRITE_ERRORS
+
+def _flush(ops):
+    """Commit ``ops`` as one batch, falling back to one write at a time.
+
+    A batch is atomic, so one bad write (e.g. a reply to a deleted post)
+    fails the whole batch. Retrying each write on its own keeps everyone
+    else's posts; writes that still fail are reported, not dropped.
+    """
+    try:
+        _commit(ops)
+        _mark_flushed(ops)
+        return
+    except Exception as e:
+        print(f"Error flushing {len(ops)} forum writes to Firestore, retrying one at a time: {e}")
+
+    for op in ops:
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            try:
+                _commit([op])
+                _mark_flushed([op])
+                break
+            except Exception as e:
+                print(f"Error writing forum {op['kind']} {op.get('reply_id', op['post_id'])} "
+                      f"(attempt {attempt + 1}): {e}")
+                if _is_permanent(e) or attempt == MAX_WRITE_ATTEMPTS - 1:
+                    _mark_failed(op, e)
+                    break
+                time.sleep(0.5 * 2 ** attempt)
+
+def _local_items(op):
+    if op["kind"] == "post":
+        return [_local_posts.get(op["post_id"])]
+    return [r for r in _local_replies.get(op["post_id"], []) if r["id"] == op["reply_id"]]
+
+def _mark_flushed(ops):
+    now = time.time()
+    with _lock:
+        for op in ops:
+            for item in _local_items(op):
+                if item:
+                    item["pending"] = False
+                    item["flushed_at"] = now
+
+def _mark_failed(op, error):
+    """Keep the item visible as not delivered and record it for get_failed_writes()."""
+    with _lock:
+        for item in _local_items(op):
+            if item:
+                item["pending"] = False
+                item["failed"] = True
+                item["failed_at"] = time.time()
+        _failed_writes.append({
+            "kind": op["kind"],
+            "post_id": op["post_id"],
+            "reply_id": op.get("reply_id"),
+            "name": op["data"].get("name"),
+            "error": str(error),
+            "failed_at": datetime.now().isoformat(),
+        })
+
+def get_failed_writes():
+    """Posts and replies that could not be written to Firestore."""
+    with _lock:
+        return list(_failed_writes)
+
+def _prune_local():
+    """Drop local items that every live cached feed has picked up since they were flushed.
+
+    Expired feeds are evicted first: they are refetched before being served
+    again, so an old one (e.g. the search feed) must not hold items back.
+    Failed items are dropped after FAILED_ITEM_TTL.
+    """
+    now = time.time()
+    with _lock:
+        for limit, (fetched_at, _) in list(_feed_cache.items()):
+            if now - fetched_at >= FEED_CACHE_TTL:
+                del _feed_cache[limit]
+        fetch_started = min((fetched_at for fetched_at, _ in _feed_cache.values()), default=now)
+
+        def keep(item):
+            if item.get("failed"):
+                return now - item["failed_at"] < FAILED_ITEM_TTL
+            return not (item["flushed_at"] and item["flushed_at"] < fetch_started)
+
+        for post_id, post in list(_local_posts.items()):
+            if not keep(post):
+                del _local_posts[post_id]
+        for post_id, replies in list(_local_replies.items()):
+            replies[:] = [r for r in replies if keep(r)]
+            if not replies:
+                del _local_replies[post_id]
+
+def _merge_local(posts):
+    """Feed with not-yet-fetched local posts and replies merged in."""
+    with _lock:
+        fetched_ids = {post['id'] for post in posts}
+        new_posts = sorted(
+            (p for p in _local_posts.values() if p['id'] not in fetched_ids),
+            key=lambda p: p['created_at'],
+            reverse=True
+        )
+        merged = []
+        for post in new_posts + posts:
+            post = dict(post, replies=list(post.get('replies', [])))
+            reply_ids = {reply.get('id') for reply in post['replies']}
+            for reply in _local_replies.get(post['id'], []):
+                if reply['id'] not in reply_ids:
+                    post['replies'].append(dict(reply))
+            merged.append(post)
+        return merged
+
 def get_forum_posts(limit=10):
     if not db:
         return []
     
+    # Serve the feed from a short-lived cache so reruns after posting don't
+    # refetch every post and reply thread
+    with _lock:
+        cached = _feed_cache.get(limit)
+    if cached and time.time() - cached[0] < FEED_CACHE_TTL:
+        return _merge_local(cached[1])
+    
+    fetch_started = time.time()
+    posts = _fetch_forum_posts(limit)
+    if posts is not None:
+        with _lock:
+            _feed_cache[limit] = (fetch_started, posts)
+        _prune_local()
+    return _merge_local(posts or [])
+
+def _fetch_forum_posts(limit):
     try:
         posts_ref = db.collection('forum_posts').order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
         posts = []
@@ -99,6 +333,7 @@ def get_forum_posts(limit=10):
             replies = []
             for reply_doc in replies_ref.stream():
                 reply_data = reply_doc.to_dict()
+                reply_data['id'] = reply_doc.id
                 if 'timestamp' in reply_data and reply_data['timestamp']:
                     reply_data['timestamp'] = reply_data['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
                 elif 'created_at' in reply_data:
@@ -111,7 +346,7 @@ def get_forum_posts(limit=10):
         return posts
     except Exception as e:
         print(f"Error getting posts from Firestore: {e}")
-        return []
+        return None
 
 def add_reply(post_id, name, message):
     if not db:
@@ -127,19 +362,26 @@ def add_reply(post_id, name, message):
         return False, "Input too short"
     
     try:
+        now = datetime.now()
         reply_data = {
             "name": name,
             "message": message,
             "timestamp": firestore.SERVER_TIMESTAMP,
-            "created_at": datetime.now().isoformat()
+            "created_at": now.isoformat()
         }
         
-        post_ref = db.collection('forum_posts').document(post_id)
-        post_ref.collection('replies').add(reply_data)
-        
-        post_ref.update({
-            "reply_count": firestore.Increment(1)
-        })
+        reply_id = db.collection('forum_posts').document(post_id).collection('replies').document().id
+        with _lock:
+            _local_replies.setdefault(post_id, []).append({
+                "id": reply_id,
+                "name": name,
+                "message": message,
+                "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+                "created_at": now.isoformat(),
+                "pending": True,
+                "flushed_at": None
+            })
+        _enqueue_write({"kind": "reply", "post_id": post_id, "reply_id": reply_id, "data": reply_data})
         
         return True, "Reply added successfully"
     except Exception as e:
@@ -0,0 +1,132 @@
+import copy
+import json
+import os
+from datetime import datetime
+
+INSIGHTS_PATH = os.getenv("CROP_INSIGHTS_PATH", "crop_insights.json")
+
+# Coarse soil/climate buckets. Each entry is (name, upper bound); the last
+# bucket of every feature is open-ended.
+TEMPERATURE_BUCKETS = [("cool", 20.0), ("warm", 30.0), ("hot", None)]
+RAINFALL_BUCKETS = [("low", 100.0), ("moderate", 200.0), ("high", None)]
+PH_BUCKETS = [("acidic", 6.0), ("neutral", 7.5), ("alkaline", None)]
+
+BUCKET_DESCRIPTIONS = {
+    "cool": "cool temperatures (below 20°C)",
+    "warm": "warm temperatures (20-30°C)",
+    "hot": "hot temperatures (above 30°C)",
+    "low": "low rainfall (below 100 mm)",
+    "moderate": "moderate rainfall (100-200 mm)",
+    "high": "high rainfall (above 200 mm)",
+    "acidic": "acidic soil (pH below 6.0)",
+    "neutral": "neutral soil (pH 6.0-7.5)",
+    "alkaline": "alkaline soil (pH above 7.5)",
+}
+
+_cache = {"path": None, "mtime": None, "data": None}
+
+def _bucket_name(value, buckets):
+    for name, upper in buckets:
+        if upper is None or value < upper:
+            return name
+    return buckets[-1][0]
+
+def get_bucket(features):
+    """Map a feature list (N, P, K, temperature, humidity, ph, rainfall) to its bucket key."""
+    temperature = _bucket_name(float(features[3]), TEMPERATURE_BUCKETS)
+    rainfall = _bucket_name(float(features[6]), RAINFALL_BUCKETS)
+    ph = _bucket_name(float(features[5]), PH_BUCKETS)
+    return f"{temperature}-{rainfall}-{ph}"
+
+def all_buckets():
+    return [
+        f"{t}-{r}-{p}"
+        for t, _ in TEMPERATURE_BUCKETS
+        for r, _ in RAINFALL_BUCKETS
+        for p, _ in PH_BUCKETS
+    ]
+
+def build_insight_prompt(crop, bucket, lang="en"):
+    language_instruction = ""
+    if lang == "te":
+        language_instruction = "Please provide the response in Telugu language."
+
+    conditions = ", ".join(BUCKET_DESCRIPTIONS[part] for part in bucket.split("-"))
+
+    return f"""Provide detailed agricultural guidance for {crop} cultivation,
+    focusing on:
+    1. Optimal cultivation process
+    2. Recommended fertilizers
+    3. Pest prevention strategies
+    4. Best cultivation seasons
+    5. Key growth requirements
+
+    The field has {conditions}.
+    Provide comprehensive agricultural insights taking these conditions into account.
+
+    {language_instruction}"""
+
+def load_insights(path=INSIGHTS_PATH):
+    """Load the knowledge base, re-reading the file only when it changes on disk."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+
+    mtime = (stat.st_mtime_ns, stat.st_size)
+    if _cache["path"] != path or _cache["mtime"] != mtime:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading crop insights: {e}")
+            return {}
+        _cache.update(path=path, mtime=mtime, data=data.get("insights", {}))
+
+    return _cache["data"]
+
+def get_crop_insight(crop, features, lang="en", path=INSIGHTS_PATH):
+    """Return the stored insight document for this crop/language/bucket, or None."""
+    insights = load_insights(path)
+    return insights.get(crop, {}).get(lang, {}).get(get_bucket(features))
+
+def _save_insights(path, insights):
+    payload = {
+        "version": 1,
+        "generated_at": datetime.now().isoformat(),
+        "insights": insights,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def build_knowledge_base(generate, crops, langs=("en", "te"), path=INSIGHTS_PATH, rebuild=False):
+    """Generate and store one insight document per crop, language and bucket.
+
+    ``generate`` takes a prompt and returns the generated text, or None on
+    failure. Existing documents are kept unless ``rebuild`` is set, so an
+    interrupted build can simply be re-run. Returns (generated, skipped, failed).
+    """
+    insights = {} if rebuild else copy.deepcopy(load_insights(path))
+    generated = skipped = failed = 0
+
+    for crop in crops:
+        for lang in langs:
+            docs = insights.setdefault(crop, {}).setdefault(lang, {})
+            for bucket in all_buckets():
+                if docs.get(bucket):
+                    skipped += 1
+                    continue
+
+                text = generate(build_insight_prompt(crop, bucket, lang))
+                if text:
+                    docs[bucket] = text.strip()
+                    generated += 1
+                else:
+                    failed += 1
+
+            # Save after every crop/language pair so progress survives interruptions
+            _save_insights(path, insights)
+
+    return generated, skipped, failed
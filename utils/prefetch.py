@@ -0,0 +1,93 @@
+"""Speculative prefetch of AI insights for the runner-up crops.
+
+As soon as a recommendation is known, insight generation for the next few
+crops is started on a shared, bounded worker pool. The results are held
+per session, so opening another crop's insights is instant when the
+prefetch has finished. Prefetch generators return None when they couldn't
+produce an insight (for example when only spare upstream capacity may be
+used and there is none); such crops are fetched on demand instead.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "3"))
+
+# Shared by all sessions so prefetching can never run more than
+# PREFETCH_WORKERS upstream calls at once
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="insight-prefetch")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "cancelled": 0}
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+def prefetch_stats():
+    """Hit/miss counts and hit rate across all sessions."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+class InsightPrefetcher:
+    """Per-session set of in-flight insight generations, keyed by the inputs they were started for."""
+
+    def __init__(self):
+        self.key = None
+        self.futures = {}
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, key, crops, generate):
+        """Start ``generate(crop)`` for each crop; a new key cancels the previous batch."""
+        if key == self.key:
+            return
+        self.cancel()
+        self.key = key
+        self.futures = {crop: _executor.submit(generate, crop) for crop in crops}
+
+    def cancel(self):
+        # Queued work is dropped; calls already running finish but their results are discarded
+        cancelled = sum(future.cancel() for future in self.futures.values())
+        if cancelled:
+            _count("cancelled", cancelled)
+        self.futures = {}
+        self.key = None
+
+    def get(self, key, crop, generate):
+        """Return the insight for ``crop``, from the prefetch when it produced one.
+
+        Otherwise ``generate(crop)`` is called on demand. Its result is not
+        kept, so a failure is retried on the next lookup.
+        """
+        future = self.futures.get(crop) if key == self.key else None
+
+        if future is not None and future.done() and not future.cancelled() and self._result(future):
+            self.hits += 1
+            _count("hits")
+            return future.result()
+
+        self.misses += 1
+        _count("misses")
+        if future is not None and not future.done():
+            # Still running: wait for it rather than issuing a second upstream call
+            result = self._result(future, wait=True)
+            if result:
+                return result
+        return generate(crop)
+
+    @staticmethod
+    def _result(future, wait=False):
+        try:
+            return future.result() if wait or future.done() else None
+        except Exception:
+            return None
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,168 @@
+"""Admission control for expensive outbound calls.
+
+Each upstream has a token bucket per user and a global cap on concurrent
+calls. State lives in a SQLite database so every Streamlit worker process
+on the host shares the same limits. Rejected calls are expected to degrade
+to the last good cached response, or to a fast "try later" message.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", ".rate_limit.sqlite3")
+
+# rate: tokens refilled per second for each user, burst: bucket size,
+# max_concurrency: calls in flight across all users and processes,
+# reserved_slots: slots speculative (prefetch) calls may never take,
+# cache_ttl: seconds a cached response may be served when a call is shed
+UPSTREAM_LIMITS = {
+    "huggingface": {"rate": 1 / 15, "burst": 4, "max_concurrency": 4, "reserved_slots": 2,
+                    "cache_ttl": 24 * 3600},
+    "openweather": {"rate": 1 / 5, "burst": 6, "max_concurrency": 8, "reserved_slots": 2,
+                    "cache_ttl": 3 * 3600},
+}
+
+# Cached responses kept per upstream; the least recently used go first
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2000))
+
+# Concurrency slots older than this are treated as leaked by a crashed worker
+SLOT_LEASE_SECONDS = 120
+
+RATE_LIMITED = "rate_limited"
+OVERLOADED = "overloaded"
+
+_local = threading.local()
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(RATE_LIMIT_DB, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS buckets (
+            upstream TEXT, user TEXT, tokens REAL, updated REAL,
+            PRIMARY KEY (upstream, user))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS slots (
+            id TEXT PRIMARY KEY, upstream TEXT, acquired REAL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS response_cache (
+            upstream TEXT, key TEXT, value TEXT, stored REAL, used REAL,
+            PRIMARY KEY (upstream, key))""")
+        conn.execute("CREATE INDEX IF NOT EXISTS response_cache_used ON response_cache (upstream, used)")
+        _local.conn = conn
+    return conn
+
+def try_acquire(upstream, user=None, speculative=False):
+    """Try to admit one call. Returns (slot_id, None) or (None, reason).
+
+    Speculative calls only use spare capacity: they are not charged to a
+    user's bucket and are shed while fewer than ``reserved_slots`` are free.
+    """
+    limits = UPSTREAM_LIMITS[upstream]
+    now = time.time()
+
+    try:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE acquired < ?", (now - SLOT_LEASE_SECONDS,))
+            (in_flight,) = conn.execute(
+                "SELECT COUNT(*) FROM slots WHERE upstream = ?", (upstream,)
+            ).fetchone()
+            max_in_flight = limits["max_concurrency"] - (limits["reserved_slots"] if speculative else 0)
+            if in_flight >= max_in_flight:
+                conn.execute("ROLLBACK")
+                return None, OVERLOADED
+
+            if user and not speculative:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE upstream = ? AND user = ?",
+                    (upstream, user),
+                ).fetchone()
+                tokens = limits["burst"] if row is None else min(
+                    limits["burst"], row[0] + (now - row[1]) * limits["rate"]
+                )
+                if tokens < 1:
+                    conn.execute("ROLLBACK")
+                    return None, RATE_LIMITED
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (upstream, user, tokens, updated) VALUES (?, ?, ?, ?)",
+                    (upstream, user, tokens - 1, now),
+                )
+
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO slots (id, upstream, acquired) VALUES (?, ?, ?)", (slot_id, upstream, now)
+            )
+            conn.execute("COMMIT")
+            return slot_id, None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        # Fail open: a broken limiter must not take the app down with it.
+        # Speculative calls are optional, so they fail closed instead.
+        print(f"Rate limiter unavailable: {e}")
+        return (None, OVERLOADED) if speculative else (None, None)
+
+def release(slot_id):
+    try:
+        _connect().execute("DELETE FROM slots WHERE id = ?", (slot_id,))
+    except sqlite3.Error as e:
+        print(f"Error releasing rate limiter slot: {e}")
+
+@contextmanager
+def admission(upstream, user=None, speculative=False):
+    """Yield None when the call is admitted, otherwise the rejection reason."""
+    slot_id, reason = try_acquire(upstream, user, speculative)
+    try:
+        yield reason
+    finally:
+        if slot_id:
+            release(slot_id)
+
+def cache_response(upstream, key, value):
+    """Remember the last good response so shed calls can be served from it."""
+    now = time.time()
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (upstream, key, value, stored, used) VALUES (?, ?, ?, ?, ?)",
+            (upstream, key, json.dumps(value), now, now),
+        )
+        _evict_responses(conn, upstream, now)
+    except sqlite3.Error as e:
+        print(f"Error caching {upstream} response: {e}")
+
+def _evict_responses(conn, upstream, now):
+    conn.execute(
+        "DELETE FROM response_cache WHERE upstream = ? AND stored < ?",
+        (upstream, now - UPSTREAM_LIMITS[upstream]["cache_ttl"]),
+    )
+    (count,) = conn.execute("SELECT COUNT(*) FROM response_cache WHERE upstream = ?", (upstream,)).fetchone()
+    if count > RESPONSE_CACHE_MAX_ENTRIES:
+        conn.execute(
+            """DELETE FROM response_cache WHERE upstream = ? AND key IN (
+                SELECT key FROM response_cache WHERE upstream = ? ORDER BY used LIMIT ?)""",
+            (upstream, upstream, count - RESPONSE_CACHE_MAX_ENTRIES),
+        )
+
+def get_cached_response(upstream, key):
+    """The cached response for ``key`` if it hasn't expired, else None."""
+    now = time.time()
+    try:
+        conn = _connect()
+        row = conn.execute(
+            "SELECT value FROM response_cache WHERE upstream = ? AND key = ? AND stored >= ?",
+            (upstream, key, now - UPSTREAM_LIMITS[upstream]["cache_ttl"]),
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE response_cache SET used = ? WHERE upstream = ? AND key = ?", (now, upstream, key)
+            )
+    except sqlite3.Error as e:
+        print(f"Error reading cached {upstream} response: {e}")
+        return None
+    return json.loads(row[0]) if row else None
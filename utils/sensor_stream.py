@@ -0,0 +1,295 @@
+"""Streaming ingestion of soil-sensor readings with continuous recommendations.
+
+Readings from field probes (N, P, K, pH, temperature, humidity) arrive
+through a broker, are averaged per field over a sliding time window, and
+the crop model is only re-run for fields whose windowed features moved by
+more than a change threshold since their last recommendation. Dirty fields
+are evaluated together in one batch and the latest recommendation per
+field is published to a queryable store.
+"""
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from utils.crops import FEATURE_NAMES, crop_dict
+
+SENSOR_FEATURES = ["N", "P", "K", "temperature", "humidity", "ph"]
+READINGS_TOPIC = "soil-readings"
+
+# Probes don't measure rainfall; fields use their configured value or this default
+DEFAULT_RAINFALL_MM = float(os.getenv("DEFAULT_RAINFALL_MM", "100.0"))
+
+class LocalBroker:
+    """In-process stand-in for a message broker (MQTT/Kafka style topics)."""
+
+    def __init__(self, max_pending=10000):
+        self._topics = {}
+        self._lock = threading.Lock()
+        self.max_pending = max_pending
+
+    def _queue(self, topic):
+        with self._lock:
+            if topic not in self._topics:
+                self._topics[topic] = queue.Queue(maxsize=self.max_pending)
+            return self._topics[topic]
+
+    def publish(self, topic, messages):
+        """Publish a list of messages as one unit; blocks when the consumer falls behind."""
+        self._queue(topic).put(messages)
+
+    def consume(self, topic, max_messages=5000, timeout=0.2):
+        q = self._queue(topic)
+        try:
+            messages = list(q.get(timeout=timeout))
+        except queue.Empty:
+            return []
+        while len(messages) < max_messages:
+            try:
+                messages.extend(q.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+class FieldWindow:
+    """Running sums of one field's readings over a sliding time window."""
+
+    __slots__ = ("readings", "sums", "latest_ts", "rainfall", "evaluated")
+
+    def __init__(self, rainfall):
+        self.readings = deque()
+        self.sums = [0.0] * len(SENSOR_FEATURES)
+        self.latest_ts = 0.0
+        self.rainfall = rainfall
+        self.evaluated = None
+
+    def add(self, ts, values, window_seconds):
+        self.readings.append((ts, values))
+        sums = self.sums
+        for i, v in enumerate(values):
+            sums[i] += v
+        if ts > self.latest_ts:
+            self.latest_ts = ts
+
+        cutoff = self.latest_ts - window_seconds
+        readings = self.readings
+        while readings and readings[0][0] < cutoff:
+            _, old = readings.popleft()
+            for i, v in enumerate(old):
+                sums[i] -= v
+
+    def features(self):
+        """Windowed mean in model order (N, P, K, temperature, humidity, ph, rainfall)."""
+        n = len(self.readings)
+        return [s / n for s in self.sums] + [self.rainfall]
+
+class RecommendationStore:
+    """Latest recommendation per field, in memory and persisted to SQLite."""
+
+    def __init__(self, path=":memory:"):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS field_recommendations (
+            field_id TEXT PRIMARY KEY, crop TEXT, features TEXT, readings INTEGER, updated_at REAL)""")
+        for field_id, crop, features, readings, updated_at in self._db.execute(
+            "SELECT field_id, crop, features, readings, updated_at FROM field_recommendations"
+        ):
+            self._latest[field_id] = {
+                "field_id": field_id, "crop": crop, "features": json.loads(features),
+                "readings": readings, "updated_at": updated_at,
+            }
+
+    def publish(self, recommendations):
+        with self._lock:
+            for rec in recommendations:
+                self._latest[rec["field_id"]] = rec
+            self._db.executemany(
+                "INSERT OR REPLACE INTO field_recommendations VALUES (?, ?, ?, ?, ?)",
+                [(r["field_id"], r["crop"], json.dumps(r["features"]), r["readings"], r["updated_at"])
+                 for r in recommendations],
+            )
+
+    def get(self, field_id):
+        with self._lock:
+            return self._latest.get(field_id)
+
+    def all(self):
+        with self._lock:
+            return list(self._latest.values())
+
+def make_predictor(model, sc=None, ms=None, monitor=None):
+    """Batch predictor from raw feature rows to crop names.
+
+    Works with the pickled model and scalers, or with a compact forest
+    (scalers folded in) when ``sc``/``ms`` are None. Each batch is recorded
+    into ``monitor`` (a DriftMonitor) when one is given.
+    """
+    def predict(rows):
+        raw = np.asarray(rows, dtype=float)
+        X = sc.transform(ms.transform(raw)) if ms is not None else raw
+        labels = model.predict(X)
+        if monitor is not None:
+            monitor.record(raw, labels)
+        return [crop_dict.get(label) for label in labels]
+    return predict
+
+class SensorPipeline:
+    def __init__(self, predict, store, window_seconds=900.0, change_threshold=0.05,
+                 feature_ranges=None, min_readings=3, field_rainfall=None):
+        self.predict = predict
+        self.store = store
+        self.window_seconds = window_seconds
+        self.change_threshold = change_threshold
+        self.min_readings = min_readings
+        # Change is measured relative to each feature's range so N (0-140)
+        # and pH (3-10) are comparable
+        ranges = feature_ranges if feature_ranges is not None else [1.0] * len(FEATURE_NAMES)
+        self.inv_ranges = [1.0 / r if r else 0.0 for r in ranges]
+        self.field_rainfall = dict(field_rainfall or {})
+        self.fields = {}
+        self.dirty = set()
+        self.stats = {"readings": 0, "rejected": 0, "evaluations": 0, "batches": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_field_rainfall(self, field_id, rainfall_mm):
+        if not math.isfinite(rainfall_mm):
+            raise ValueError(f"rainfall must be a finite number, got {rainfall_mm}")
+        with self._lock:
+            self.field_rainfall[field_id] = rainfall_mm
+            window = self.fields.get(field_id)
+            if window is not None:
+                window.rainfall = rainfall_mm
+                self.dirty.add(field_id)
+
+    def ingest(self, readings):
+        """Add a batch of reading dicts to their fields' windows."""
+        with self._lock:
+            self._ingest(readings)
+
+    def _ingest(self, readings):
+        window_seconds = self.window_seconds
+        fields = self.fields
+        dirty = self.dirty
+        now = time.time()
+        rejected = 0
+
+        for reading in readings:
+            try:
+                field_id = str(reading["field_id"])
+                values = (
+                    float(reading["N"]), float(reading["P"]), float(reading["K"]),
+                    float(reading["temperature"]), float(reading["humidity"]), float(reading["ph"]),
+                )
+                ts = float(reading.get("ts", now))
+                rainfall = float(reading["rainfall"]) if "rainfall" in reading else None
+            except (KeyError, TypeError, ValueError, AttributeError):
+                rejected += 1
+                continue
+            # float() accepts "nan" and "inf", which would poison the window's running sums
+            if not all(map(math.isfinite, values)) or not math.isfinite(ts) or (
+                rainfall is not None and not math.isfinite(rainfall)
+            ):
+                rejected += 1
+                continue
+
+            window = fields.get(field_id)
+            if window is None:
+                window = fields[field_id] = FieldWindow(
+                    self.field_rainfall.get(field_id, DEFAULT_RAINFALL_MM)
+                )
+            if rainfall is not None:
+                window.rainfall = rainfall
+            window.add(ts, values, window_seconds)
+            dirty.add(field_id)
+
+        self.stats["readings"] += len(readings) - rejected
+        self.stats["rejected"] += rejected
+
+    def _changed(self, window):
+        if window.evaluated is None:
+            return True
+        current = window.features()
+        return any(
+            abs(c - e) * inv > self.change_threshold
+            for c, e, inv in zip(current, window.evaluated, self.inv_ranges)
+        )
+
+    def flush(self):
+        """Re-run the model for dirty fields whose windowed features crossed the change threshold."""
+        with self._lock:
+            return self._flush()
+
+    def _flush(self):
+        candidates = [
+            field_id for field_id in self.dirty
+            if len(self.fields[field_id].readings) >= self.min_readings
+        ]
+        self.dirty.difference_update(candidates)
+        changed = [field_id for field_id in candidates if self._changed(self.fields[field_id])]
+        if not changed:
+            return 0
+
+        rows = [self.fields[field_id].features() for field_id in changed]
+        try:
+            crops = self.predict(rows)
+            now = time.time()
+            recommendations = [{
+                "field_id": field_id,
+                "crop": crop,
+                "features": dict(zip(FEATURE_NAMES, row)),
+                "readings": len(self.fields[field_id].readings),
+                "updated_at": now,
+            } for field_id, row, crop in zip(changed, rows, crops)]
+            self.store.publish(recommendations)
+        except Exception:
+            # Retry these fields on the next flush
+            self.dirty.update(changed)
+            raise
+        for field_id, row in zip(changed, rows):
+            self.fields[field_id].evaluated = row
+        self.stats["evaluations"] += len(changed)
+        self.stats["batches"] += 1
+        return len(changed)
+
+    def run(self, broker, topic=READINGS_TOPIC, flush_interval=1.0, max_batch=20000):
+        """Consume readings from ``broker`` until stop() is called."""
+        last_flush = time.time()
+        while not self._stop.is_set():
+            readings = broker.consume(topic, max_batch)
+            if readings:
+                try:
+                    self.ingest(readings)
+                except Exception as e:
+                    print(f"Error ingesting {len(readings)} sensor readings: {e}")
+                    self.stats["rejected"] += len(readings)
+                    self.stats["errors"] += 1
+            if time.time() - last_flush >= flush_interval:
+                self._flush_logged()
+                last_flush = time.time()
+        self._flush_logged()
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error updating field recommendations: {e}")
+            self.stats["errors"] += 1
+
+    def start(self, broker, **kwargs):
+        self._thread = threading.Thread(target=self.run, args=(broker,), kwargs=kwargs,
+                                        name="sensor-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,200 @@
+"""Server-side store for bulky per-session data.
+
+Streamlit keeps everything in st.session_state for as long as a browser
+tab is connected, with no limit. Chat history and the current inputs live
+here instead, keyed by a session id. Each session has a memory budget,
+enforced by compacting chat history, and sessions idle for too long are
+evicted. When the store as a whole goes over its memory budget, the least
+recently used sessions are spilled to SQLite and loaded back on access.
+"""
+import abc
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sqlite")
+SESSION_SPILL_DB = os.getenv("SESSION_SPILL_DB", ".sessions.sqlite3")
+SESSION_MEMORY_BUDGET = int(os.getenv("SESSION_MEMORY_BUDGET", 64 * 1024))
+STORE_MEMORY_BUDGET = int(os.getenv("STORE_MEMORY_BUDGET", 64 * 1024 * 1024))
+SESSION_IDLE_TIMEOUT = int(os.getenv("SESSION_IDLE_TIMEOUT", 30 * 60))
+
+# Chat messages longer than this are cut down when a session is over budget
+MAX_MESSAGE_CHARS = 4000
+# Compaction never drops the latest question and answer
+MIN_CHAT_MESSAGES = 2
+EVICTION_INTERVAL = 60
+
+class SessionStore(abc.ABC):
+    """Interface for per-session storage backends."""
+
+    @abc.abstractmethod
+    def get(self, session_id, key, default=None):
+        """Value stored under ``key`` for the session, or ``default``."""
+
+    @abc.abstractmethod
+    def set(self, session_id, key, value):
+        """Store ``value`` under ``key`` for the session."""
+
+    @abc.abstractmethod
+    def append_chat(self, session_id, role, content):
+        """Append a message to the session's chat history."""
+
+    @abc.abstractmethod
+    def delete(self, session_id):
+        """Forget everything stored for the session."""
+
+    @abc.abstractmethod
+    def evict_idle(self):
+        """Drop idle sessions. Returns how many were dropped."""
+
+    @abc.abstractmethod
+    def stats(self):
+        """Aggregate memory and spill usage."""
+
+def _size(data):
+    return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+
+def compact_session(data, budget):
+    """Shrink a session's chat history until it fits ``budget`` bytes. Returns the new size."""
+    size = _size(data)
+    history = data.get("chat_history")
+    if size <= budget or not history:
+        return size
+
+    for message in history:
+        if len(message["content"]) > MAX_MESSAGE_CHARS:
+            message["content"] = message["content"][:MAX_MESSAGE_CHARS] + "…"
+    size = _size(data)
+
+    # Drop the oldest exchanges first
+    while size > budget and len(history) > MIN_CHAT_MESSAGES:
+        drop = max(1, (len(history) - MIN_CHAT_MESSAGES) // 4)
+        del history[:drop]
+        size = _size(data)
+    return size
+
+class LRUSessionStore(SessionStore):
+    """In-memory LRU of sessions, optionally spilling to SQLite when over budget."""
+
+    def __init__(self, memory_budget=STORE_MEMORY_BUDGET, session_budget=SESSION_MEMORY_BUDGET,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, spill_path=None):
+        self.memory_budget = memory_budget
+        self.session_budget = session_budget
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._sessions = OrderedDict()
+        self._memory_bytes = 0
+        self._last_eviction = time.time()
+        self._spill = None
+        if spill_path:
+            self._spill = sqlite3.connect(spill_path, check_same_thread=False, isolation_level=None)
+            self._spill.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY, data BLOB, size INTEGER, last_access REAL)""")
+
+    def _session(self, session_id):
+        """Session entry, loaded back from the spill file if needed, marked most recently used."""
+        entry = self._sessions.get(session_id)
+        if entry is None and self._spill is not None:
+            row = self._spill.execute("SELECT data, size FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row:
+                self._spill.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                entry = {"data": pickle.loads(row[0]), "size": row[1]}
+                self._sessions[session_id] = entry
+                self._memory_bytes += entry["size"]
+        if entry is None:
+            entry = {"data": {}, "size": 0}
+            self._sessions[session_id] = entry
+        entry["last_access"] = time.time()
+        self._sessions.move_to_end(session_id)
+        self._enforce_memory_budget()
+        return entry
+
+    def _resize(self, entry):
+        new_size = compact_session(entry["data"], self.session_budget)
+        self._memory_bytes += new_size - entry["size"]
+        entry["size"] = new_size
+        self._enforce_memory_budget()
+
+    def _enforce_memory_budget(self):
+        # Keep the most recently used session in memory whatever its size
+        while self._memory_bytes > self.memory_budget and len(self._sessions) > 1:
+            session_id, entry = self._sessions.popitem(last=False)
+            self._memory_bytes -= entry["size"]
+            if self._spill is not None:
+                self._spill.execute(
+                    "INSERT OR REPLACE INTO sessions (id, data, size, last_access) VALUES (?, ?, ?, ?)",
+                    (session_id, pickle.dumps(entry["data"]), entry["size"], entry["last_access"]),
+                )
+
+    def _maybe_evict(self):
+        if time.time() - self._last_eviction >= EVICTION_INTERVAL:
+            self.evict_idle()
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            self._maybe_evict()
+            return self._session(session_id)["data"].get(key, default)
+
+    def set(self, session_id, key, value):
+        with self._lock:
+            self._maybe_evict()
+            entry = self._session(session_id)
+            entry["data"][key] = value
+            self._resize(entry)
+
+    def append_chat(self, session_id, role, content):
+        with self._lock:
+            entry = self._session(session_id)
+            entry["data"].setdefault("chat_history", []).append({"role": role, "content": content})
+            self._resize(entry)
+
+    def delete(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry:
+                self._memory_bytes -= entry["size"]
+            if self._spill is not None:
+                self._spill.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def evict_idle(self):
+        """Drop sessions that haven't been touched for ``idle_timeout`` seconds. Returns how many."""
+        with self._lock:
+            cutoff = time.time() - self.idle_timeout
+            idle = [sid for sid, entry in self._sessions.items() if entry["last_access"] < cutoff]
+            for session_id in idle:
+                self._memory_bytes -= self._sessions.pop(session_id)["size"]
+            evicted = len(idle)
+            if self._spill is not None:
+                evicted += self._spill.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,)).rowcount
+            self._last_eviction = time.time()
+            return evicted
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "sessions_in_memory": len(self._sessions),
+                "memory_bytes": self._memory_bytes,
+                "largest_session_bytes": max((e["size"] for e in self._sessions.values()), default=0),
+                "sessions_spilled": 0,
+                "spilled_bytes": 0,
+            }
+            if self._spill is not None:
+                count, total = self._spill.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+                stats["sessions_spilled"] = count
+                stats["spilled_bytes"] = total
+            return stats
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    """Process-wide store, configured by SESSION_STORE_BACKEND ("memory" or "sqlite")."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            spill_path = SESSION_SPILL_DB if SESSION_STORE_BACKEND == "sqlite" else None
+            _store = LRUSessionStore(spill_path=spill_path)
+        return _store
@@ -31,7 +31,22 @@ translations = {
         "discussion_topic": "Discussion Topic",
         "your_message": "Your Message",
         "post_message": "Post Message",
-        "recent_discussions": "Recent Discussions"
+        "recent_discussions": "Recent Discussions",
+        "try_later": "The AI assistant is busy right now. Please try again in a minute.",
+        "weather_try_later": "Weather service is busy right now. Please try again in a minute.",
+        "other_crops": "Other suitable crops",
+        "why_this_crop": "Why this crop?",
+        "attribution_caption": "Baseline {base:.0%} → {probability:.0%} confidence. Bars show how much each input raised or lowered the score (percentage points).",
+        "input_monitoring": "Input monitoring",
+        "diagnostics": "Diagnostics",
+        "prefetch_stats": "Insight prefetch (all sessions): {hits} hits, {misses} misses, {hit_rate:.0%} hit rate, {cancelled} cancelled",
+        "drift_caption": "{records} predictions recorded. Score ≥ 1 means the inputs have moved away from the training data. Predicted crop mix drift: {class_drift:.0%}",
+        "drift_feature": "feature",
+        "drift_score": "score",
+        "drift_out_of_range": "out of range",
+        "drift_mean_shift": "mean shift (std)",
+        "drift_percentiles": "p05 / p50 / p95",
+        "drift_training_range": "training range"
     },
     "te": {
         "app_title": "🌱 స్మార్ట్ పంట సిఫార్సు వ్యవస్థ",
@@ -65,7 +80,22 @@ translations = {
         "discussion_topic": "చర్చా అంశం",
         "your_message": "మీ సందేశం",
         "post_message": "సందేశం పోస్ట్ చేయండి",
-        "recent_discussions": "ఇటీవలి చర్చలు"
+        "recent_discussions": "ఇటీవలి చర్చలు",
+        "try_later": "AI సహాయకుడు ప్రస్తుతం బిజీగా ఉన్నారు. దయచేసి ఒక నిమిషం తర్వాత మళ్ళీ ప్రయత్నించండి.",
+        "weather_try_later": "వాతావరణ సేవ ప్రస్తుతం బిజీగా ఉంది. దయచేసి ఒక నిమిషం తర్వాత మళ్ళీ ప్రయత్నించండి.",
+        "other_crops": "ఇతర అనుకూల పంటలు",
+        "why_this_crop": "ఈ పంట ఎందుకు?",
+        "attribution_caption": "ప్రాథమిక విశ్వాసం {base:.0%} → {probability:.0%}. ప్రతి ఇన్‌పుట్ స్కోరును ఎంత పెంచిందో లేదా తగ్గించిందో బార్‌లు చూపిస్తాయి (శాతం పాయింట్లు).",
+        "input_monitoring": "ఇన్‌పుట్ పర్యవేక్షణ",
+        "diagnostics": "నిర్ధారణ సమాచారం",
+        "prefetch_stats": "ముందస్తు సమాచారం (అన్ని సెషన్లు): {hits} హిట్లు, {misses} మిస్‌లు, హిట్ రేటు {hit_rate:.0%}, {cancelled} రద్దు",
+        "drift_caption": "{records} అంచనాలు నమోదయ్యాయి. స్కోరు ≥ 1 అంటే ఇన్‌పుట్‌లు శిక్షణ డేటా నుండి దూరమయ్యాయి. అంచనా వేసిన పంటల మిశ్రమంలో మార్పు: {class_drift:.0%}",
+        "drift_feature": "లక్షణం",
+        "drift_score": "స్కోరు",
+        "drift_out_of_range": "పరిధి వెలుపల",
+        "drift_mean_shift": "సగటు మార్పు (std)",
+        "drift_percentiles": "p05 / p50 / p95",
+        "drift_training_range": "శిక్షణ పరిధి"
     }
 }
 
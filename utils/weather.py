@@ -1,21 +1,35 @@
 import requests
 import streamlit as st
 import os
+from utils.rate_limit import admission, cache_response, get_cached_response
+from utils.translations import get_text
 
-def get_weather_forecast(city):
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5")
+
+def _cache_key(kind, city):
+    return f"{kind}:{city.strip().lower()}"
+
+def get_weather_forecast(city, user=None, lang="en"):
     api_key = st.secrets["openweather_Apikey"] or os.getenv("openweather_Apikey")
     if not api_key:
         return None, "Weather API key not configured"
     
+    with admission("openweather", user) as rejected:
+        if rejected:
+            cached = get_cached_response("openweather", _cache_key("weather", city))
+            return (cached, None) if cached else (None, get_text(lang, 'weather_try_later'))
+        return _fetch_weather(city, api_key)
+
+def _fetch_weather(city, api_key):
     try:
-        base_url = "http://api.openweathermap.org/data/2.5/weather"
+        base_url = f"{OPENWEATHER_BASE_URL}/weather"
         params = {
             "q": city,
             "appid": api_key,
             "units": "metric"
         }
         
-        response = requests.get(base_url, params=params)
+        response = requests.get(base_url, params=params, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -31,6 +45,7 @@ def get_weather_forecast(city):
                 "pressure": data["main"]["pressure"]
             }
             
+            cache_response("openweather", _cache_key("weather", city), weather_info)
             return weather_info, None
         else:
             return None, f"City not found or API error: {response.status_code}"
@@ -38,21 +53,28 @@ def get_weather_forecast(city):
     except Exception as e:
         return None, f"Error fetching weather: {str(e)}"
 
-def get_forecast_5day(city):
+def get_forecast_5day(city, user=None, lang="en"):
     api_key = st.secrets.get("openweather_Apikey") or os.getenv("openweather_Apikey")
     
     if not api_key:
         return None, "Weather API key not configured"
     
+    with admission("openweather", user) as rejected:
+        if rejected:
+            cached = get_cached_response("openweather", _cache_key("forecast", city))
+            return (cached, None) if cached else (None, get_text(lang, 'weather_try_later'))
+        return _fetch_forecast(city, api_key)
+
+def _fetch_forecast(city, api_key):
     try:
-        base_url = "http://api.openweathermap.org/data/2.5/forecast"
+        base_url = f"{OPENWEATHER_BASE_URL}/forecast"
         params = {
             "q": city,
             "appid": api_key,
             "units": "metric"
         }
         
-        response = requests.get(base_url, params=params)
+        response = requests.get(base_url, params=params, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -66,6 +88,7 @@ def get_forecast_5day(city):
                     "humidity": item["main"]["humidity"]
                 })
             
+            cache_response("openweather", _cache_key("forecast", city), forecast_list)
             return forecast_list, None
         else:
             return None, f"City not found or API error: {response.status_code}"